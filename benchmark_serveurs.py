@@ -0,0 +1,81 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Client asynchrone de python-socketio : il a besoin d'aiohttp pour ouvrir des WebSocket.
+try:
+    import aiohttp  # noqa: F401
+    import socketio
+except ImportError:
+    socketio = None
+
+from server import percentile
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+REQUESTS_PER_CLIENT = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+BACKENDS = sys.argv[3].split(',') if len(sys.argv) > 3 else ['eventlet', 'asgi']
+URL = 'http://127.0.0.1:5000'
+
+def start_server(backend):
+    """Lance server.py avec le moteur demandé et attend qu'il réponde."""
+    process = subprocess.Popen([sys.executable, 'server.py'], env=dict(os.environ, QUIZ_BACKEND=backend),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(URL, timeout=1).close()
+            return process
+        except OSError: time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Le serveur {backend} n'a pas démarré.")
+
+async def connect_client():
+    client = socketio.AsyncClient()
+    replies = asyncio.Queue()
+    client.on('player_stats_response', lambda data: replies.put_nowait(time.perf_counter()))
+    start = time.perf_counter()
+    await client.connect(URL, transports=['websocket'])
+    return client, replies, (time.perf_counter() - start) * 1000
+
+async def run_requests(client, replies):
+    """Requêtes en série (une réponse attendue avant la suivante) : chaque client mesure ses allers-retours."""
+    rtts = []
+    for i in range(REQUESTS_PER_CLIENT):
+        sent = time.perf_counter()
+        await client.emit('get_player_stats', {'name': f'bench{i}'})
+        rtts.append((await replies.get() - sent) * 1000)
+    return rtts
+
+async def measure_backend():
+    start = time.perf_counter()
+    connected = await asyncio.gather(*(connect_client() for _ in range(CLIENTS)), return_exceptions=True)
+    connect_seconds = time.perf_counter() - start
+    clients = [result for result in connected if not isinstance(result, Exception)]
+    start = time.perf_counter()
+    rtts = [rtt for result in await asyncio.gather(*(run_requests(client, replies) for client, replies, _ in clients)) for rtt in result]
+    events_seconds = time.perf_counter() - start
+    await asyncio.gather(*(client.disconnect() for client, _, _ in clients))
+    return {'connected': len(clients), 'connect_per_s': len(clients) / connect_seconds,
+            'connect_p99_ms': percentile([ms for _, _, ms in clients], 0.99),
+            'events_per_s': len(rtts) / events_seconds,
+            'p50_ms': percentile(rtts, 0.5), 'p95_ms': percentile(rtts, 0.95), 'p99_ms': percentile(rtts, 0.99)}
+
+def run_benchmark():
+    if not socketio:
+        print("Le banc d'essai a besoin du client asynchrone de python-socketio : pip install aiohttp.")
+        return
+    print(f"{CLIENTS} clients WebSocket, {REQUESTS_PER_CLIENT} requêtes get_player_stats chacun")
+    print(f"{'Moteur':<10}{'Connectés':>10}{'Conn./s':>10}{'Conn. p99':>11}{'Évt/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for backend in BACKENDS:
+        process = start_server(backend)
+        try: result = asyncio.run(measure_backend())
+        finally:
+            process.terminate(); process.wait()
+        print(f"{backend:<10}{result['connected']:>10}{result['connect_per_s']:>10.0f}{result['connect_p99_ms']:>11.1f}"
+              f"{result['events_per_s']:>10.0f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}")
+
+if __name__ == '__main__':
+    run_benchmark()
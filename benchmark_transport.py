@@ -0,0 +1,95 @@
+import sys
+import time
+import zlib
+import gzip
+
+from socketio import packet
+
+# On réutilise le serveur pour produire de vrais messages (état de salle, vue joueur, panneau admin...).
+import server
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+try:
+    from socketio import msgpack_packet
+    import msgpack  # noqa: F401 (requis par msgpack_packet)
+except ImportError:
+    msgpack_packet = None
+
+def build_sample_events():
+    """Construit les événements les plus fréquents d'une partie de 8 joueurs à partir des vraies données."""
+    server.load_data()
+    state = server.create_new_game_state()
+    for i in range(8):
+        state['players'].append({"sid": f"sid{i:020d}", "name": f"Joueur {i + 1}", "avatar_id": i, "score": 10 * i, "color": '#3b82f6',
+                                 "token": f"{i:032x}", "is_special": False})
+    state['game_started'] = True; state['current_mode_key'] = 'simple'; state['current_player_index'] = 0
+    state['info_text'] = "Au tour de Joueur 1"
+    prepared = server.draw_question_view('simple', state['question_bank_session'])
+    public_question = server.set_current_question(state, prepared) if prepared else None
+    public_state = server.get_public_state(state)
+    rooms = {f"R{i:03d}": {"player_count": i % 8, "is_started": bool(i % 2)} for i in range(10)}
+    return [
+        ('update_state', public_state),
+        ('update_player_view', {'view': 'question', 'data': {'question': public_question, 'is_my_turn': False}, 'state': public_state}),
+        ('update_room_list', {'rooms': rooms}),
+        ('update_admin_view', server.get_admin_summary()),
+        ('admin_section', {'section': 'rooms', 'view': 'rooms', 'version': 1, 'page': 0, 'page_size': 25, 'total': 1, 'items': [{'room_id': 'ABCD', 'state': public_state}]}),
+    ]
+
+def websocket_frame_size(payload_size):
+    """Taille d'une trame WebSocket serveur -> client (non masquée) pour une charge utile donnée."""
+    return payload_size + (2 if payload_size < 126 else 4 if payload_size < 65536 else 10)
+
+def encode_json(event, data):
+    return ('4' + packet.Packet(packet.EVENT, data=[event, data]).encode()).encode('utf-8')
+
+def encode_msgpack(event, data):
+    return msgpack_packet.MsgPackPacket(packet.EVENT, data=[event, data]).encode()
+
+def profile_polling(event, data, _state):
+    body = encode_json(event, data)
+    # Compression HTTP (gzip) appliquée par Engine.IO au-delà du seuil, sans en-têtes HTTP comptés.
+    return len(gzip.compress(body)) if len(body) >= 1024 else len(body)
+
+def profile_websocket(event, data, _state):
+    return websocket_frame_size(len(encode_json(event, data)))
+
+def make_deflate_profile(encoder):
+    def profile(event, data, state):
+        # permessage-deflate avec reprise de contexte : un seul compresseur pour toute la connexion.
+        compressor = state.setdefault('compressor', zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15))
+        compressed = compressor.compress(encoder(event, data)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return websocket_frame_size(len(compressed) - 4)
+    return profile
+
+def profile_websocket_msgpack(event, data, _state):
+    return websocket_frame_size(len(encode_msgpack(event, data)))
+
+PROFILES = [
+    ('polling + json', profile_polling),
+    ('websocket + json', profile_websocket),
+    ('websocket + deflate', make_deflate_profile(encode_json)),
+]
+if msgpack_packet:
+    PROFILES += [('websocket + msgpack', profile_websocket_msgpack), ('websocket + msgpack + deflate', make_deflate_profile(encode_msgpack))]
+
+def run_benchmark():
+    events = build_sample_events()
+    print(f"{ITERATIONS} envois par événement" + ("" if msgpack_packet else " (msgpack non installé : profils msgpack ignorés)"))
+    print(f"{'Profil':<32}{'Événement':<22}{'Octets/évt':>12}{'CPU µs/évt':>12}")
+    for name, profile in PROFILES:
+        total_bytes = total_cpu = 0
+        for event, data in events:
+            # Taille du premier envoi (contexte de compression vierge, cas le plus défavorable), CPU moyen ensuite.
+            state = {}
+            size = profile(event, data, state)
+            start = time.process_time()
+            for _ in range(ITERATIONS): profile(event, data, state)
+            cpu_us = (time.process_time() - start) / ITERATIONS * 1e6
+            total_bytes += size; total_cpu += cpu_us
+            print(f"{name:<32}{event:<22}{size:>12}{cpu_us:>12.1f}")
+        print(f"{name:<32}{'moyenne':<22}{total_bytes // len(events):>12}{total_cpu / len(events):>12.1f}\n")
+
+if __name__ == '__main__':
+    run_benchmark()
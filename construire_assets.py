@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+
+# Les URL d'origine sont celles utilisées par les pages quand aucun build n'est présent.
+from server import ASSET_SOURCES, ASSET_MANIFEST_FILE, MUSIC_SOUNDS
+
+BUILD_DIR = os.path.dirname(ASSET_MANIFEST_FILE)
+# Un navigateur récent reçoit des polices woff2 de Google Fonts ; un client inconnu recevrait du ttf.
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36'
+TAILWIND_CONFIG = "module.exports = { darkMode: 'class', content: [%s] };\n"
+TAILWIND_INPUT = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+SOUNDS_DIR = os.path.join('static', 'sounds')
+# (extension, type MIME, arguments ffmpeg) ; les bruitages passent en mono, les musiques gardent la stéréo.
+SOUND_VARIANTS = [
+    ('.opus', 'audio/ogg; codecs=opus', {'music': ['-c:a', 'libopus', '-b:a', '64k', '-f', 'ogg'], 'sfx': ['-ac', '1', '-c:a', 'libopus', '-b:a', '32k', '-f', 'ogg']}),
+    ('.m4a', 'audio/mp4', {'music': ['-c:a', 'aac', '-b:a', '96k', '-movflags', '+faststart'], 'sfx': ['-ac', '1', '-c:a', 'aac', '-b:a', '64k', '-movflags', '+faststart']}),
+]
+
+def download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response: return response.read()
+
+def write_hashed(name, content, subdir=''):
+    """Écrit le fichier sous un nom contenant l'empreinte de son contenu et renvoie son chemin relatif à static/."""
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+    os.makedirs(os.path.join(BUILD_DIR, subdir), exist_ok=True)
+    with open(os.path.join(BUILD_DIR, subdir, filename), 'wb') as f: f.write(content)
+    return '/'.join(part for part in ('build', subdir, filename) if part)
+
+def vendor_font_css(url):
+    """Télécharge une feuille Google Fonts et ses fichiers de police, en réécrivant les url() vers les copies locales."""
+    css = download(url).decode('utf-8')
+    def localize(match):
+        font_url = match.group(1)
+        font_path = write_hashed(os.path.basename(font_url.split('?')[0]), download(font_url), 'fonts')
+        return f"url({font_path[len('build/'):]})"
+    return re.sub(r'url\((https://[^)]+)\)', localize, css).encode('utf-8')
+
+def find_tailwind_cli():
+    if shutil.which('tailwindcss'): return ['tailwindcss']
+    if shutil.which('npx'): return ['npx', '--yes', 'tailwindcss@3']
+    return None
+
+def build_tailwind_css():
+    """Compile une seule fois les classes Tailwind réellement utilisées par les templates."""
+    cli = find_tailwind_cli()
+    if not cli:
+        print("Tailwind CLI introuvable (tailwindcss ou npx) : les pages garderont le CDN Tailwind.")
+        return None
+    templates = os.path.abspath('templates').replace('\\', '/')
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path, input_path, output_path = (os.path.join(tmp, name) for name in ('tailwind.config.js', 'input.css', 'output.css'))
+        with open(config_path, 'w', encoding='utf-8') as f: f.write(TAILWIND_CONFIG % json.dumps(f"{templates}/*.html"))
+        with open(input_path, 'w', encoding='utf-8') as f: f.write(TAILWIND_INPUT)
+        subprocess.run(cli + ['-c', config_path, '-i', input_path, '-o', output_path, '--minify'], check=True)
+        with open(output_path, 'rb') as f: return f.read()
+
+def build_sounds():
+    """Transcode chaque son en variantes Opus et AAC compactes et décrit le résultat (chemins, tailles, empreintes)."""
+    if not shutil.which('ffmpeg'):
+        print("ffmpeg introuvable : les sons restent servis en MP3 d'origine.")
+        return {}
+    sounds = {}
+    for filename in sorted(os.listdir(SOUNDS_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext.lower() != '.mp3': continue
+        source_path = os.path.join(SOUNDS_DIR, filename)
+        with open(source_path, 'rb') as f: original = f.read()
+        kind = 'music' if name in MUSIC_SOUNDS else 'sfx'
+        entry = {'size': len(original), 'hash': hashlib.sha256(original).hexdigest()[:10], 'sources': []}
+        with tempfile.TemporaryDirectory() as tmp:
+            for variant_ext, mime_type, arguments in SOUND_VARIANTS:
+                output_path = os.path.join(tmp, name + variant_ext)
+                subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', source_path, '-vn'] + arguments[kind] + [output_path], check=True)
+                with open(output_path, 'rb') as f: content = f.read()
+                # Une variante plus lourde que le MP3 n'apporte rien.
+                if len(content) < len(original):
+                    entry['sources'].append({'path': write_hashed(name + variant_ext, content, 'sounds'), 'type': mime_type, 'size': len(content)})
+        print(f"{filename} : {len(original) // 1024} Ko -> " + ', '.join(f"{v['type'].split(';')[0]} {v['size'] // 1024} Ko" for v in entry['sources']))
+        sounds[name] = entry
+    return sounds
+
+def build_assets():
+    if os.path.isdir(BUILD_DIR): shutil.rmtree(BUILD_DIR)
+    manifest = {}
+    for name, url in ASSET_SOURCES.items():
+        print(f"Téléchargement de {name}...")
+        content = vendor_font_css(url) if name.endswith('.css') else download(url)
+        manifest[name] = write_hashed(name, content)
+    tailwind_css = build_tailwind_css()
+    if tailwind_css: manifest['tailwind.css'] = write_hashed('tailwind.css', tailwind_css)
+    sounds = build_sounds()
+    if sounds: manifest['sounds'] = sounds
+    with open(ASSET_MANIFEST_FILE, 'w', encoding='utf-8') as f: json.dump(manifest, f, indent=4)
+    print(f"{len(manifest)} ressources écrites dans {BUILD_DIR}. Redémarrez le serveur pour les servir.")
+
+if __name__ == '__main__':
+    build_assets()
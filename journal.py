@@ -0,0 +1,114 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Journal du serveur. Le code de jeu appelle `logger` et ne fait jamais d'écriture lui-même : l'enregistrement part dans
+# une file, et un thread d'écoute le recopie vers la console, le tampon circulaire lu par le lanceur Tk et, en option,
+# un fichier JSON lines. Module séparé de server.py pour n'exister qu'une fois par processus (serveur_asgi réimporte server).
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(message)s'
+LOG_DATE_FORMAT = '%H:%M:%S'
+# Champs structurés passés par `extra=` et repris tels quels dans le fichier JSON lines.
+LOG_FIELDS = ('room_id', 'sid', 'player')
+
+logger = logging.getLogger('quiz')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+log_queue = queue.SimpleQueue()
+log_buffer = deque(maxlen=2000)
+LOG_STATS = {'overwritten': 0}
+settings = {'level': 'INFO', 'buffer_lines': 2000, 'json_file': '', 'json_max_mb': 10, 'console': True}
+listener = None
+listener_lock = threading.Lock()
+
+class DeferredQueueHandler(QueueHandler):
+    """Met l'enregistrement en file sans le formater : le formatage se fait dans le thread d'écoute.
+    La file reste dans le processus, rien n'est sérialisé ; les arguments des messages sont des chaînes ou des nombres."""
+    def prepare(self, record): return record
+
+logger.addHandler(DeferredQueueHandler(log_queue))
+
+class RingBufferHandler(logging.Handler):
+    """Garde les dernières lignes formatées ; le lanceur Tk les retire par lots depuis son propre thread."""
+    def emit(self, record): append_lines([self.format(record)])
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                 'level': record.levelname, 'message': record.getMessage()}
+        entry.update({field: getattr(record, field) for field in LOG_FIELDS if hasattr(record, field)})
+        if record.exc_info: entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class BufferStream:
+    """Remplace sys.stdout / sys.stderr sous le lanceur : les print() restants et les traces d'erreur rejoignent le
+    tampon au lieu d'écrire dans un widget Tk depuis un autre thread."""
+    def __init__(self):
+        self.pending = ''; self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            *lines, self.pending = (self.pending + text).split('\n')
+        if lines: append_lines(lines)
+        return len(text)
+
+    def flush(self): pass
+
+def append_lines(lines):
+    overflow = len(log_buffer) + len(lines) - log_buffer.maxlen
+    if overflow > 0: LOG_STATS['overwritten'] += overflow
+    log_buffer.extend(lines)
+
+def read_lines(limit=500):
+    """Retire au plus `limit` lignes du tampon, les plus anciennes d'abord."""
+    lines = []
+    while log_buffer and len(lines) < limit:
+        try: lines.append(log_buffer.popleft())
+        except IndexError: break
+    return lines
+
+def create_handlers():
+    formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    handlers = [RingBufferHandler()]
+    if settings['console'] and sys.__stdout__: handlers.append(logging.StreamHandler(sys.__stdout__))
+    if settings['json_file']:
+        handlers.append(RotatingFileHandler(settings['json_file'], maxBytes=int(settings['json_max_mb'] * 1024 * 1024), backupCount=3, encoding='utf-8'))
+        handlers[-1].setFormatter(JsonLinesFormatter())
+    for handler in handlers:
+        if not handler.formatter: handler.setFormatter(formatter)
+    return handlers
+
+def configure(config=None, console=None):
+    """Applique la section 'logging' de la configuration et (re)démarre le thread d'écoute.
+    Avant le premier appel, les enregistrements attendent dans la file."""
+    global listener, log_buffer
+    with listener_lock:
+        if config: settings.update(config)
+        if console is not None: settings['console'] = console
+        logger.setLevel(str(settings['level']).upper())
+        if log_buffer.maxlen != settings['buffer_lines']: log_buffer = deque(log_buffer, maxlen=settings['buffer_lines'])
+        if listener:
+            listener.stop()
+            for handler in listener.handlers: handler.close()
+        listener = QueueListener(log_queue, *create_handlers(), respect_handler_level=True)
+        listener.start()
+
+def stop():
+    global listener
+    with listener_lock:
+        if not listener: return
+        listener.stop()
+        for handler in listener.handlers: handler.close()
+        listener = None
+
+def get_metrics():
+    return {'level': logging.getLevelName(logger.level), 'queued': log_queue.qsize(), 'buffered': len(log_buffer),
+            'overwritten': LOG_STATS['overwritten'], 'json_file': settings['json_file'] or None}
+
+# Les derniers enregistrements en file sont écrits avant la sortie du processus.
+atexit.register(stop)
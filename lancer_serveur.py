@@ -5,32 +5,35 @@ import sys
 import os
 import subprocess
 
+import journal
+from journal import logger
 # On importe l'application Flask et l'objet SocketIO depuis votre fichier server.py
-from server import app, socketio, load_data
+from server import app, socketio, load_data, start_background_services, wait_for_handoff, request_drain, SERVER_BACKEND
 
-class TextRedirector:
-    """Une classe pour rediriger le texte de la console vers un widget Tkinter."""
-    def __init__(self, widget):
-        self.widget = widget
-
-    def write(self, str):
-        self.widget.config(state=tk.NORMAL)
-        self.widget.insert(tk.END, str)
-        self.widget.see(tk.END) # Fait défiler vers le bas automatiquement
-        self.widget.config(state=tk.DISABLED)
-
-    def flush(self):
-        pass # Requis par sys.stdout
+# La console est vidée par lots depuis la boucle Tk : jamais d'écriture dans le widget depuis le thread du serveur.
+CONSOLE_REFRESH_MS = 200
+CONSOLE_BATCH_LINES = 500
+CONSOLE_MAX_LINES = 5000
 
 def run_flask_app():
     """Fonction qui lance le serveur Socket.IO."""
-    print("Démarrage du serveur Flask/Socket.IO...")
+    logger.info("Démarrage du serveur Flask/Socket.IO (%s)...", SERVER_BACKEND)
     try:
         # On utilise le port 5000 et l'hôte 0.0.0.0 comme dans votre script original
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False)
-        print("Serveur arrêté.")
+        if SERVER_BACKEND == 'asgi':
+            # uvicorn lance lui-même les tâches de fond quand sa boucle asyncio démarre.
+            import serveur_asgi
+            serveur_asgi.run(host='0.0.0.0', port=5000)
+        else:
+            # En relève (QUIZ_TAKEOVER=<pid>), les données ne sont chargées qu'une fois le drain de l'ancien serveur terminé.
+            wait_for_handoff()
+            logger.info("Chargement des données initiales...")
+            load_data()
+            start_background_services()
+            socketio.run(app, host='0.0.0.0', port=5000, debug=False)
+        logger.info("Serveur arrêté.")
     except Exception as e:
-        print(f"ERREUR SERVEUR: {e}")
+        logger.exception("ERREUR SERVEUR: %s", e)
 
 def create_gui():
     """Crée et configure l'interface graphique."""
@@ -43,19 +46,34 @@ def create_gui():
     button_frame.pack(fill=tk.X)
 
     # --- Fonctions des boutons ---
+    def close_when_drained():
+        # Le thread du serveur se termine à la fin du drain (parties finies, salles sauvegardées, écritures vidées).
+        if server_thread.is_alive(): root.after(500, close_when_drained)
+        else: root.destroy()
+
+    def start_drain():
+        # Pendant le drain, le bouton « Arrêter » devient « Forcer l'arrêt » : les parties en cours sont figées sans attendre leur fin.
+        restart_button.config(state=tk.DISABLED)
+        stop_button.config(text="Forcer l'arrêt", command=force_stop)
+        request_drain()
+        close_when_drained()
+
     def restart_server():
-        print("\n>>> REDÉMARRAGE DU SERVEUR...\n")
-        # Relance le script actuel dans un nouveau processus
+        logger.info(">>> REDÉMARRAGE DU SERVEUR (après les parties en cours)...")
+        # Le nouveau processus démarre tout de suite mais attend le marqueur de fin de drain de ce processus-ci.
         python_executable = sys.executable
         script_path = os.path.abspath(__file__)
-        subprocess.Popen([python_executable, script_path])
-        # Ferme la fenêtre actuelle
-        root.destroy()
+        subprocess.Popen([python_executable, script_path], env=dict(os.environ, QUIZ_TAKEOVER=str(os.getpid())))
+        start_drain()
 
     def stop_server():
-        print("\n>>> ARRÊT DU SERVEUR...\n")
-        # Ferme simplement la fenêtre. Le thread du serveur étant un "daemon", il s'arrêtera avec le programme principal.
-        root.destroy()
+        logger.info(">>> ARRÊT DU SERVEUR (après les parties en cours)...")
+        start_drain()
+
+    def force_stop():
+        logger.info(">>> ARRÊT FORCÉ : les parties en cours sont sauvegardées en l'état.")
+        stop_button.config(state=tk.DISABLED)
+        request_drain()
 
     # --- Création des boutons ---
     restart_button = tk.Button(button_frame, text="Redémarrer", command=restart_server, width=15, height=2, bg="#f59e0b", fg="white", font=("Arial", 10, "bold"))
@@ -68,9 +86,24 @@ def create_gui():
     console_output = scrolledtext.ScrolledText(root, state=tk.DISABLED, wrap=tk.WORD, bg="black", fg="white", font=("Courier New", 10))
     console_output.pack(expand=True, fill=tk.BOTH, padx=10, pady=5)
 
-    # Rediriger stdout (les prints) et stderr (les erreurs) vers notre widget
-    sys.stdout = TextRedirector(console_output)
-    sys.stderr = TextRedirector(console_output)
+    def pump_console():
+        lines = journal.read_lines(CONSOLE_BATCH_LINES)
+        if lines:
+            console_output.config(state=tk.NORMAL)
+            console_output.insert(tk.END, '\n'.join(lines) + '\n')
+            # Au-delà de CONSOLE_MAX_LINES, les plus anciennes lignes sont retirées du widget.
+            excess = int(console_output.index('end-1c').split('.')[0]) - CONSOLE_MAX_LINES
+            if excess > 0: console_output.delete('1.0', f'{excess + 1}.0')
+            console_output.see(tk.END) # Fait défiler vers le bas automatiquement
+            console_output.config(state=tk.DISABLED)
+        # Un lot plein laisse présager d'autres lignes en attente : on repasse aussitôt.
+        root.after(10 if len(lines) == CONSOLE_BATCH_LINES else CONSOLE_REFRESH_MS, pump_console)
+
+    # Le journal n'écrit plus sur la console ; stdout (les print restants) et stderr (les erreurs) rejoignent son tampon.
+    journal.configure(console=False)
+    sys.stdout = journal.BufferStream()
+    sys.stderr = journal.BufferStream()
+    pump_console()
 
     # --- Lancement du serveur dans un thread séparé ---
     # Le 'daemon=True' assure que le thread s'arrête quand la fenêtre principale est fermée
@@ -81,6 +114,4 @@ def create_gui():
     root.mainloop()
 
 if __name__ == '__main__':
-    print("Chargement des données initiales...")
-    load_data() # Charge les données une fois avant de lancer l'interface
     create_gui()
\ No newline at end of file
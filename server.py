@@ -1,20 +1,40 @@
 import os
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, copy_current_request_context
+from markupsafe import Markup
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from werkzeug.utils import secure_filename
 import json
 import random
-import copy
+import hashlib
+import heapq
+import functools
+import bisect
+import itertools
+import re
+import unicodedata
+import statistics
+import sys
+import tracemalloc
+from array import array
+from collections import deque
+import base64
+import zlib
 import threading
+import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 import secrets
+import signal
 import time
+import journal
+from journal import logger
 
 # --- CONFIGURATION ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'une_cle_secrete_par_defaut')
 app.config['UPLOAD_FOLDER'] = '.'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
 # --- GESTION DES FICHIERS DE DONNÉES (JSON) ---
 CONFIG_FILE = 'config.json'
@@ -24,17 +44,58 @@ QUESTIONS_ESTIMATION_FILE = 'questions_estimation.json'
 HISTORY_FILE = 'game_history.json'
 CHANGELOG_FILE = 'changelog.json'
 STATS_FILE = 'player_stats.json'
+QUESTION_STATS_FILE = 'question_stats.json'
+QUESTION_IDS_FILE = 'question_ids.json'
 
 CONFIG = {}
 QUESTION_BANK = {}
 GAME_HISTORY = []
 CHANGELOG_ENTRIES = []
 PLAYER_STATS = {}
+QUESTION_STATS = {}
+QUESTION_IDS = {}
 json_lock = threading.Lock()
 
+def load_transport_profile():
+    """Profil de transport Socket.IO, lu directement dans config.json : le serveur est créé avant load_data()
+    et une modification ne prend effet qu'au redémarrage."""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f: return json.load(f).get('transport', {})
+    except (FileNotFoundError, json.JSONDecodeError): return {}
+
+def load_server_backend():
+    """Moteur du serveur, lu comme le profil de transport : 'eventlet' (par défaut) ou 'asgi' (uvicorn, voir serveur_asgi.py).
+    La variable d'environnement QUIZ_BACKEND a priorité sur config.json."""
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f: backend = json.load(f).get('server', {}).get('backend', 'eventlet')
+    except (FileNotFoundError, json.JSONDecodeError): backend = 'eventlet'
+    return os.environ.get('QUIZ_BACKEND', backend)
+
+TRANSPORT_PROFILE = load_transport_profile()
+SERVER_BACKEND = load_server_backend()
+SOCKETIO_OPTIONS = {'cors_allowed_origins': "*",
+                    'transports': ['websocket'] if TRANSPORT_PROFILE.get('websocket_only') else ['polling', 'websocket'],
+                    # « compression » est l'ancien nom de la clé : il ne portait déjà que sur le long-polling HTTP.
+                    'http_compression': TRANSPORT_PROFILE.get('http_compression', TRANSPORT_PROFILE.get('compression', True)),
+                    'compression_threshold': TRANSPORT_PROFILE.get('compression_threshold', 1024)}
+# En mode ASGI, l'instance Flask-SocketIO ne sert qu'à enregistrer les gestionnaires : serveur_asgi.py les confie à un
+# AsyncServer. Le mode 'threading' évite alors d'importer eventlet.
+socketio = SocketIO(app, async_mode='eventlet' if SERVER_BACKEND == 'eventlet' else 'threading', **SOCKETIO_OPTIONS)
+if SERVER_BACKEND == 'eventlet' and not TRANSPORT_PROFILE.get('websocket_compression', True):
+    # Le serveur WebSocket d'eventlet accepte permessage-deflate dès que le navigateur le propose : on décline l'extension.
+    class UncompressedWebSocket(socketio.server.eio._async['websocket']):
+        def _negotiate_permessage_deflate(self, extensions): return None
+    socketio.server.eio._async = dict(socketio.server.eio._async, websocket=UncompressedWebSocket)
+
+@app.context_processor
+def inject_socketio_options():
+    # Les pages doivent demander le même transport que le serveur, sinon la connexion WebSocket seule échoue.
+    return {'socketio_options': {'transports': ['websocket']} if TRANSPORT_PROFILE.get('websocket_only') else {}}
+
 def load_data():
     """Charge toutes les données depuis les fichiers JSON."""
-    global CONFIG, QUESTION_BANK, GAME_HISTORY, CHANGELOG_ENTRIES, PLAYER_STATS
+    global CONFIG, QUESTION_BANK, GAME_HISTORY, CHANGELOG_ENTRIES, PLAYER_STATS, QUESTION_STATS, QUESTION_IDS
+    config_created = False
     with json_lock:
         try:
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f: CONFIG = json.load(f)
@@ -43,7 +104,37 @@ def load_data():
             if 'points_config' not in CONFIG:
                 CONFIG['points_config'] = {"simple": 10, "buzzer": 10, "intrus": 50, "estimation_perfect": 150, "estimation_close": 100}
             if 'music_default_on' not in CONFIG: CONFIG['music_default_on'] = False
-            print("Fichier de configuration chargé.")
+            if 'question_prefetch' not in CONFIG: CONFIG['question_prefetch'] = 5
+            if 'transport' not in CONFIG:
+                CONFIG['transport'] = {"websocket_only": False, "http_compression": True, "compression_threshold": 1024, "websocket_compression": True}
+            if 'worker_pool' not in CONFIG:
+                CONFIG['worker_pool'] = {"processes": 2, "max_pending": 32}
+            if 'checkpoints' not in CONFIG:
+                CONFIG['checkpoints'] = {"enabled": True, "interval_seconds": 5, "resume_delay_seconds": 15, "max_age_seconds": 3600}
+            if 'drain' not in CONFIG: CONFIG['drain'] = {"timeout_seconds": 900}
+            if 'overload' not in CONFIG:
+                CONFIG['overload'] = {"enabled": True, "sample_interval_ms": 100, "shed_lag_ms": 50, "critical_lag_ms": 250, "shed_queue_depth": 20, "critical_queue_depth": 100, "recover_seconds": 5, "shed_coalesce_factor": 5}
+            if 'diagnostics' not in CONFIG:
+                CONFIG['diagnostics'] = {"profile_max_seconds": 60, "sample_interval_ms": 5, "tracemalloc_frames": 1, "top": 25}
+            if 'logging' not in CONFIG:
+                CONFIG['logging'] = {"level": "INFO", "buffer_lines": 2000, "json_file": "", "json_max_mb": 10}
+            if 'server' not in CONFIG:
+                CONFIG['server'] = {"backend": "eventlet", "worker_threads": 8}
+            if 'telemetry' not in CONFIG:
+                CONFIG['telemetry'] = {"ping_interval_seconds": 10, "window": 20}
+            if 'buzzer' not in CONFIG:
+                CONFIG['buzzer'] = {"arbitration_window_ms": 40, "compensate_latency": True, "max_compensation_ms": 150}
+            if 'estimation_reveal' not in CONFIG:
+                CONFIG['estimation_reveal'] = {"closest": 8, "buckets": 10}
+            if 'audience' not in CONFIG:
+                CONFIG['audience'] = {"enabled": True, "max_contestants": 8, "max_audience": 200, "histogram_interval_ms": 500}
+            if 'room_lifecycle' not in CONFIG:
+                CONFIG['room_lifecycle'] = {"sweep_seconds": 30, "lobby_idle_ttl": 1800, "playing_idle_ttl": 3600, "finished_ttl": 600, "memory_budget_mb": 64, "disconnect_grace_seconds": 300}
+            if 'rate_limits' not in CONFIG:
+                CONFIG['rate_limits'] = {"effect_per_sid": {"rate": 1, "burst": 3}, "effect_per_room": {"rate": 4, "burst": 8}, "reaction_per_sid": {"rate": 3, "burst": 6}, "reaction_coalesce_ms": 200}
+            if 'question_sampler' not in CONFIG:
+                CONFIG['question_sampler'] = {"target_correct_rate": [0.3, 0.85], "min_answers": 5, "novelty_exponent": 0.5, "out_of_band_factor": 0.25}
+            logger.info("Fichier de configuration chargé.")
         except (FileNotFoundError, json.JSONDecodeError):
             CONFIG = {
                 "game_title": "Quiz Night Arena", "admin_password": "admin",
@@ -54,9 +145,26 @@ def load_data():
                 "game_rules": {"questions_per_player_simple": 2, "questions_total_buzzer": 5, "questions_per_player_intrus": 1, "questions_total_estimation": 5},
                 "music_default_on": False,
                 "game_modes_enabled": {"simple": True, "buzzer": True, "intrus": True, "estimation": True},
-                "points_config": {"simple": 10, "buzzer": 10, "intrus": 50, "estimation_perfect": 150, "estimation_close": 100}
+                "points_config": {"simple": 10, "buzzer": 10, "intrus": 50, "estimation_perfect": 150, "estimation_close": 100},
+                "question_prefetch": 5,
+                "question_sampler": {"target_correct_rate": [0.3, 0.85], "min_answers": 5, "novelty_exponent": 0.5, "out_of_band_factor": 0.25},
+                "rate_limits": {"effect_per_sid": {"rate": 1, "burst": 3}, "effect_per_room": {"rate": 4, "burst": 8}, "reaction_per_sid": {"rate": 3, "burst": 6}, "reaction_coalesce_ms": 200},
+                "transport": {"websocket_only": False, "http_compression": True, "compression_threshold": 1024, "websocket_compression": True},
+                "server": {"backend": "eventlet", "worker_threads": 8},
+                "worker_pool": {"processes": 2, "max_pending": 32},
+                "checkpoints": {"enabled": True, "interval_seconds": 5, "resume_delay_seconds": 15, "max_age_seconds": 3600},
+                "drain": {"timeout_seconds": 900},
+                "overload": {"enabled": True, "sample_interval_ms": 100, "shed_lag_ms": 50, "critical_lag_ms": 250, "shed_queue_depth": 20, "critical_queue_depth": 100, "recover_seconds": 5, "shed_coalesce_factor": 5},
+                "diagnostics": {"profile_max_seconds": 60, "sample_interval_ms": 5, "tracemalloc_frames": 1, "top": 25},
+                "logging": {"level": "INFO", "buffer_lines": 2000, "json_file": "", "json_max_mb": 10},
+                "telemetry": {"ping_interval_seconds": 10, "window": 20},
+                "buzzer": {"arbitration_window_ms": 40, "compensate_latency": True, "max_compensation_ms": 150},
+                "estimation_reveal": {"closest": 8, "buckets": 10},
+                "audience": {"enabled": True, "max_contestants": 8, "max_audience": 200, "histogram_interval_ms": 500},
+                "room_lifecycle": {"sweep_seconds": 30, "lobby_idle_ttl": 1800, "playing_idle_ttl": 3600, "finished_ttl": 600, "memory_budget_mb": 64, "disconnect_grace_seconds": 300}
             }
-            save_config()
+            config_created = True
+        journal.configure(CONFIG.get('logging'))
         
         try:
             with open(QUESTIONS_SIMPLES_FILE, 'r', encoding='utf-8') as f: QUESTION_BANK['questions_simples'] = json.load(f)
@@ -67,17 +175,17 @@ def load_data():
         try:
             with open(QUESTIONS_ESTIMATION_FILE, 'r', encoding='utf-8') as f: QUESTION_BANK['questions_estimation'] = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError): QUESTION_BANK['questions_estimation'] = []
-        print("Banques de questions chargées.")
+        logger.info("Banques de questions chargées.")
 
         try:
             with open(HISTORY_FILE, 'r', encoding='utf-8') as f: GAME_HISTORY = json.load(f)
-            print("Historique des parties chargé.")
+            logger.info("Historique des parties chargé.")
         except (FileNotFoundError, json.JSONDecodeError):
             GAME_HISTORY = []; save_history()
 
         try:
             with open(CHANGELOG_FILE, 'r', encoding='utf-8') as f: CHANGELOG_ENTRIES = json.load(f)
-            print("Fichier de nouveautés chargé.")
+            logger.info("Fichier de nouveautés chargé.")
         except (FileNotFoundError, json.JSONDecodeError):
             CHANGELOG_ENTRIES = []
             save_changelog()
@@ -87,47 +195,179 @@ def load_data():
             if not isinstance(PLAYER_STATS, dict):
                 PLAYER_STATS = {}
                 save_stats()
-            print("Fichier de statistiques chargé.")
+            logger.info("Fichier de statistiques chargé.")
         except (FileNotFoundError, json.JSONDecodeError):
             PLAYER_STATS = {}
             save_stats()
 
+        try:
+            with open(QUESTION_STATS_FILE, 'r', encoding='utf-8') as f: QUESTION_STATS = json.load(f)
+            if not isinstance(QUESTION_STATS, dict): QUESTION_STATS = {}
+            logger.info("Statistiques des questions chargées.")
+        except (FileNotFoundError, json.JSONDecodeError):
+            QUESTION_STATS = {}
+
+        try:
+            with open(QUESTION_IDS_FILE, 'r', encoding='utf-8') as f: QUESTION_IDS = json.load(f)
+            if not isinstance(QUESTION_IDS, dict): QUESTION_IDS = {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            QUESTION_IDS = {}
+
+    # La config par défaut d'une installation neuve est écrite hors verrou, comme les identifiants : save_json le reprend.
+    if config_created: save_config()
+    # Numérote les questions apparues depuis le dernier lancement (hors verrou : la sauvegarde le reprend).
+    known_ids = len(QUESTION_IDS)
+    for q_type, _, question in iter_bank_questions():
+        get_question_number(get_question_key(q_type, question))
+    if len(QUESTION_IDS) != known_ids: save_question_ids()
+    question_search_index.rebuild()
+    restore_room_checkpoints()
+
 def save_config():
-    with json_lock:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f: json.dump(CONFIG, f, indent=4, ensure_ascii=False)
-        print("Fichier de configuration sauvegardé.")
+    save_json(CONFIG_FILE, CONFIG, indent=4, ensure_ascii=False)
+    logger.debug("Fichier de configuration sauvegardé.")
 
 def save_questions(q_type):
-    with json_lock:
-        filename = QUESTIONS_SIMPLES_FILE
-        if q_type == 'questions_intrus':
-            filename = QUESTIONS_INTRUS_FILE
-        elif q_type == 'questions_estimation':
-            filename = QUESTIONS_ESTIMATION_FILE
-        
-        data = QUESTION_BANK.get(q_type, [])
-        if q_type == 'questions_simples':
-            data = QUESTION_BANK.get(q_type, {})
+    filename = QUESTIONS_SIMPLES_FILE
+    if q_type == 'questions_intrus':
+        filename = QUESTIONS_INTRUS_FILE
+    elif q_type == 'questions_estimation':
+        filename = QUESTIONS_ESTIMATION_FILE
 
-        with open(filename, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"Banque de questions '{q_type}' sauvegardée.")
+    data = QUESTION_BANK.get(q_type, [])
+    if q_type == 'questions_simples':
+        data = QUESTION_BANK.get(q_type, {})
+
+    save_json(filename, data, indent=4, ensure_ascii=False)
+    QUESTION_BANK_MEMORY['bytes'] = None
+    logger.debug("Banque de questions '%s' sauvegardée.", q_type)
 
 def save_history():
-    with json_lock:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f: json.dump(GAME_HISTORY, f, indent=4, ensure_ascii=False)
-        print("Historique des parties sauvegardé.")
+    save_json(HISTORY_FILE, GAME_HISTORY, indent=4, ensure_ascii=False)
+    logger.debug("Historique des parties sauvegardé.")
 
 def save_changelog():
-    with json_lock:
-        with open(CHANGELOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(CHANGELOG_ENTRIES, f, indent=4, ensure_ascii=False)
-        print("Fichier de nouveautés sauvegardé.")
+    save_json(CHANGELOG_FILE, CHANGELOG_ENTRIES, indent=4, ensure_ascii=False)
+    logger.debug("Fichier de nouveautés sauvegardé.")
 
 def save_stats():
+    save_json(STATS_FILE, PLAYER_STATS, indent=4, ensure_ascii=False)
+    logger.debug("Fichier de statistiques sauvegardé.")
+
+def save_question_stats():
+    # Format compact : {id: [servie, répondue, juste, latence cumulée en ms]}
+    save_json(QUESTION_STATS_FILE, QUESTION_STATS, separators=(',', ':'))
+    logger.debug("Statistiques des questions sauvegardées.")
+
+def save_question_ids():
+    save_json(QUESTION_IDS_FILE, QUESTION_IDS, separators=(',', ':'))
+    logger.debug("Numérotation des questions sauvegardée.")
+
+# --- TRAVAUX EN ARRIÈRE-PLAN (POOL DE PROCESSUS) ---
+# Les travaux lourds en CPU (sérialisation JSON indentée de la banque, des stats, de l'historique) tournent dans un
+# pool de processus : la boucle principale ne fait plus que les E/S réseau et les transitions d'état des salles.
+def write_json_snapshot(filename, snapshot, dump_options):
+    """Exécuté dans un processus du pool : écrit l'instantané (pickle) en JSON, de façon atomique."""
+    start = time.perf_counter()
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as f: json.dump(pickle.loads(snapshot), f, **dump_options)
+    os.replace(temp_filename, filename)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+class WorkerPool:
+    def __init__(self):
+        self.executor = None; self.processes = 0
+        self.pending = []  # [(future, callback, room_id, submitted_at)]
+        self.submitted = self.completed = self.failed = self.inline = self.max_pending = 0
+        self.total_ms = 0.0
+
+    def start(self):
+        self.processes = CONFIG.get('worker_pool', {}).get('processes', 2)
+        if self.processes > 0: self.executor = self.create_executor()
+        socketio.start_background_task(self.collect_results)
+
+    def create_executor(self):
+        # 'spawn' partout (comme sous Windows) : un fork hériterait du hub eventlet et des threads en cours.
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, func, *args, callback=None, room_id=None):
+        """Lance func(*args) dans le pool ; callback(résultat, erreur) est ensuite exécuté par l'acteur de la salle room_id
+        (ou par la tâche de collecte). Sans pool, ou file pleine, le travail s'exécute immédiatement, ici."""
+        self.submitted += 1
+        if self.executor and len(self.pending) < CONFIG.get('worker_pool', {}).get('max_pending', 32):
+            try:
+                self.pending.append((self.executor.submit(func, *args), callback, room_id, time.perf_counter()))
+                self.max_pending = max(self.max_pending, len(self.pending))
+                return
+            except BrokenProcessPool:
+                logger.warning("Pool de processus hors service : il est relancé, ce travail s'exécute ici.")
+                self.executor = self.create_executor()
+        self.inline += 1
+        start = time.perf_counter()
+        try: result, error = func(*args), None
+        except Exception as e: result, error = None, e
+        self.finish(callback, room_id, result, error, start)
+
+    def collect_results(self):
+        while True:
+            socketio.sleep(0.05)
+            for job in [job for job in self.pending if job[0].done()]:
+                self.pending.remove(job)
+                future, callback, room_id, submitted_at = job
+                error = future.exception()
+                self.finish(callback, room_id, None if error else future.result(), error, submitted_at)
+
+    def finish(self, callback, room_id, result, error, start):
+        if error: self.failed += 1
+        else: self.completed += 1; self.total_ms += (time.perf_counter() - start) * 1000
+        if callback is None:
+            if error: logger.error("Échec d'un travail en arrière-plan : %r", error)
+        elif room_id: send_to_room(room_id, callback, result, error)
+        else: callback(result, error)
+
+    def shutdown(self):
+        """Attend la fin des travaux en cours et arrête les processus ; les travaux suivants s'exécuteront sur place."""
+        if self.executor: self.executor.shutdown(wait=True); self.executor = None
+
+    def get_metrics(self):
+        return {'processes': self.processes if self.executor else 0, 'pending': len(self.pending), 'max_pending': self.max_pending,
+                'submitted': self.submitted, 'completed': self.completed, 'failed': self.failed, 'inline': self.inline,
+                'avg_ms': round(self.total_ms / self.completed, 1) if self.completed else 0}
+
+worker_pool = WorkerPool()
+
+def write_text_file(filename, text):
+    """Exécuté dans un processus du pool : écrit un texte déjà sérialisé, de façon atomique."""
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as f: f.write(text)
+    os.replace(temp_filename, filename)
+
+def remove_file(filename):
+    try: os.remove(filename)
+    except FileNotFoundError: pass
+
+# Une seule opération par fichier à la fois : la suivante attend son tour (les intermédiaires sont sautées),
+# sinon une écriture plus ancienne pourrait finir après la plus récente.
+file_jobs = {}
+
+def queue_file_job(filename, func, *args):
     with json_lock:
-        with open(STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(PLAYER_STATS, f, indent=4, ensure_ascii=False)
-        print("Fichier de statistiques sauvegardé.")
+        if filename in file_jobs:
+            file_jobs[filename] = (func, args); return
+        file_jobs[filename] = None
+    worker_pool.submit(func, *args, callback=functools.partial(finish_file_job, filename))
+
+def finish_file_job(filename, result, error):
+    if error: logger.error("Échec de l'écriture de %s : %r", filename, error)
+    with json_lock:
+        queued = file_jobs.pop(filename, None)
+        if queued: file_jobs[filename] = None
+    if queued: worker_pool.submit(queued[0], *queued[1], callback=functools.partial(finish_file_job, filename))
+
+def save_json(filename, data, **dump_options):
+    """Fige data (pickle, rapide et en C) et confie l'encodage JSON et l'écriture du fichier au pool."""
+    with json_lock: snapshot = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    queue_file_job(filename, write_json_snapshot, filename, snapshot, dump_options)
 
 # --- GESTION DE L'ÉTAT DU JEU ---
 game_states = {}
@@ -139,7 +379,7 @@ def get_dashboard_stats():
     simple_questions_count = sum(len(q_list) for q_list in simple_questions_data.values())
     intrus_questions_count = len(QUESTION_BANK.get('questions_intrus', []))
     active_rooms_count = len(game_states)
-    total_players_count = sum(len([p for p in state['players'] if not p.get('is_disconnected')]) for state in game_states.values())
+    total_players_count = sum(len([p for p in state['players'] if not p.get('is_disconnected')]) for state in list(game_states.values()))
     
     return {
         "simple_themes_count": simple_themes_count,
@@ -147,39 +387,848 @@ def get_dashboard_stats():
         "intrus_questions_count": intrus_questions_count,
         "active_rooms_count": active_rooms_count,
         "total_players_count": total_players_count,
+        "dropped_events_count": sum(RATE_LIMIT_STATS['dropped'].values()),
+        "dropped_events": dict(RATE_LIMIT_STATS['dropped']),
+        "coalesced_reactions_count": RATE_LIMIT_STATS['coalesced'],
+        "room_latency": {room_id: get_room_latency(state) for room_id, state in list(game_states.items())},
+        "polling_clients_count": sum(1 for clock in list(client_clocks.values()) if clock['transport'] == 'polling'),
+        "rooms_memory_kb": sum(size for room_id, size in list(room_sizes.items()) if room_id in game_states) // 1024,
+        "room_queues": {room_id: actor.get_metrics() for room_id, actor in list(room_actors.items())},
+        "worker_pool": worker_pool.get_metrics(),
+        "draining": DRAIN_STATE['active'],
+        "drain_forced": drain_forced.is_set(),
+        "logging": journal.get_metrics(),
+        "overload": get_overload_metrics(),
     }
 
 def create_new_game_state():
-    return { "players": [], "game_started": False, "current_mode_key": None, "current_question_data": None, "current_player_index": -1, "questions_answered_in_mode": 0, "mode_question_count": 0, "info_text": "En attente des joueurs...", "buzzer_active": False, "buzzer_winner_sid": None, "buzzer_has_answered": [], "revealed_answers": [], "question_bank_session": copy.deepcopy(QUESTION_BANK), "stop_or_encore_state": {}, "host_sid": None }
+    return { "players": [], "game_started": False, "current_mode_key": None, "current_question_data": None, "current_player_index": -1, "questions_answered_in_mode": 0, "mode_question_count": 0, "info_text": "En attente des joueurs...", "buzzer_active": False, "buzzer_winner_sid": None, "buzzer_has_answered": [], "revealed_answers": [], "question_bank_session": create_question_bank_session(), "answer_key": None, "question_queue": [], "stop_or_encore_state": {}, "host_sid": None, "lifecycle": "lobby", "last_activity": time.time(), "question_seq": 0, "audience": {}, "audience_count": 0, "audience_votes": None, "estimation_answers": None, "buzzer_opened_ns": None, "buzz_window": None, "pending_step": None }
+
+# Clés de l'état d'une salle qui ne quittent jamais le serveur.
+PRIVATE_STATE_KEYS = ('question_bank_session', 'answer_key', 'question_queue', 'audience', 'audience_votes', 'estimation_answers', 'buzzer_opened_ns', 'buzz_window', 'pending_step')
+
+def get_public_state(state):
+    """Copie superficielle de l'état d'une salle, sans la banque de session ni la clé de correction."""
+    return {key: value for key, value in state.items() if key not in PRIVATE_STATE_KEYS}
+
+# Le panneau admin charge chaque onglet à la demande, page par page. Chaque section porte un numéro de version
+# incrémenté à chaque modification : un admin (re)connecté ne recharge que les sections dont la version a changé.
+# Les compteurs repartent de 0 à chaque démarrage : la version publiée est préfixée par l'identifiant du démarrage,
+# sinon un panneau resté ouvert pendant un redémarrage prendrait ses anciennes pages pour à jour.
+ADMIN_SECTIONS = ('rooms', 'questions', 'history', 'stats', 'changelog')
+ADMIN_PAGE_SIZE = 25
+BOOT_ID = secrets.token_hex(4)
+admin_section_versions = dict.fromkeys(ADMIN_SECTIONS, 0)
+
+def get_admin_versions():
+    return {section: f"{BOOT_ID}:{count}" for section, count in admin_section_versions.items()}
+
+def read_int(data, key, default):
+    """Entier envoyé par le panneau : une valeur absente ou non numérique retombe sur le défaut."""
+    try: return int(data.get(key) or default)
+    except (TypeError, ValueError): return default
+
+def get_page_params(data, default_size):
+    """Lit « page » et « page_size » envoyés par le panneau, bornés à des valeurs raisonnables."""
+    return max(0, read_int(data, 'page', 0)), min(100, max(1, read_int(data, 'page_size', default_size)))
+
+def get_admin_summary():
+    return {'dashboard_stats': get_dashboard_stats(), 'versions': get_admin_versions()}
+
+def notify_admins(*sections):
+    """Signale aux admins les sections modifiées ; ils ne rechargent que celles qu'ils ont déjà ouvertes."""
+    for section in sections: admin_section_versions[section] += 1
+    if not admin_sids: return
+    if is_overloaded(): OVERLOAD_STATS['admin_updates_skipped'] += 1; return
+    summary = get_admin_summary()
+    for sid in list(admin_sids): socketio.emit('update_admin_view', summary, room=sid)
+
+def broadcast_to_admins(): notify_admins('rooms')
+
+def get_admin_section_items(section, data):
+    """Éléments d'une section du panneau admin, dans l'ordre d'affichage, et informations annexes éventuelles."""
+    if section == 'rooms':
+        return [{'room_id': room_id, 'state': get_public_state(state)} for room_id, state in sorted(list(game_states.items()))], {}
+    if section == 'questions':
+        q_type = data.get('type') if data.get('type') in ('questions_simples', 'questions_intrus') else 'questions_simples'
+        if q_type == 'questions_simples':
+            themes = QUESTION_BANK.get('questions_simples', {})
+            items = [{'type': q_type, 'theme': theme, 'index': i, 'question': q} for theme in sorted(themes) for i, q in enumerate(themes[theme])]
+            return items, {'type': q_type, 'themes': sorted(themes)}
+        return [{'type': q_type, 'theme': None, 'index': i, 'question': q} for i, q in enumerate(QUESTION_BANK.get(q_type, []))], {'type': q_type}
+    if section == 'history':
+        return [{'index': i, 'game': game} for i, game in enumerate(GAME_HISTORY)], {}
+    if section == 'changelog':
+        return [{'index': i, 'entry': entry} for i, entry in enumerate(CHANGELOG_ENTRIES)], {}
+    players = sorted(PLAYER_STATS.values(), key=lambda stats: (-stats.get('games_played', 0), stats.get('name', '').lower()))
+    return [{'name': stats.get('name', ''), 'games_played': stats.get('games_played', 0), 'wins': stats.get('wins', 0), 'best_score': stats.get('best_score', 0)} for stats in players], {}
+
+# --- POINTS DE REPRISE DES SALLES ---
+# Chaque salle modifiée est réécrite périodiquement dans son propre petit fichier. Au redémarrage, load_data reconstruit
+# les salles ; les joueurs reviennent par leur jeton (reconnect_player) et l'hôte par host_join_room.
+CHECKPOINT_DIR = 'checkpoints'
+# Clés volatiles jamais écrites : public (sid), votes en cours, fenêtre de buzz, minuteries sur horloge monotone.
+CHECKPOINT_SKIPPED_KEYS = ('question_bank_session', 'question_queue', 'audience', 'audience_count', 'audience_votes', 'estimation_answers', 'buzzer_opened_ns', 'buzz_window', 'pending_step')
+room_checkpoints = {}  # {room_id: dernier texte écrit}
+
+def get_checkpoint_path(room_id): return os.path.join(CHECKPOINT_DIR, f"{room_id}.json")
+
+def get_room_checkpoint(state):
+    """Ce qu'il faut pour reprendre la partie : joueurs (jetons, scores), mode, question et clé de correction, paquets."""
+    checkpoint = {key: value for key, value in state.items() if key not in CHECKPOINT_SKIPPED_KEYS}
+    # Les paquets se reconstruisent à la demande : seules les questions déjà vues et déjà servies comptent.
+    checkpoint['seen'] = encode_question_bitmap(state['question_bank_session'].get('seen', 0))
+    checkpoint['served'] = encode_question_bitmap(state['question_bank_session'].get('served', 0))
+    checkpoint['step_pending'] = bool(state['pending_step'])
+    answers = state['estimation_answers']
+    if answers: checkpoint['estimation_answers'] = {'values': list(answers['values']), 'awaiting': list(answers['awaiting']), 'revealed': answers['revealed']}
+    return checkpoint
+
+def checkpoint_room(room_id):
+    """Exécuté par l'acteur de la salle (état cohérent) ; le fichier n'est réécrit que si la salle a changé."""
+    state = game_states.get(room_id)
+    if not state: return
+    text = json.dumps(get_room_checkpoint(state), separators=(',', ':'), ensure_ascii=False)
+    if room_checkpoints.get(room_id) == text: return
+    room_checkpoints[room_id] = text
+    queue_file_job(get_checkpoint_path(room_id), write_text_file, get_checkpoint_path(room_id), text)
 
-def broadcast_to_admins():
-    for sid in admin_sids:
-        socketio.emit('update_admin_view', {
-            'game_states': game_states, 
-            'game_history': GAME_HISTORY,
-            'dashboard_stats': get_dashboard_stats()
-        }, room=sid)
+def discard_room_checkpoint(room_id):
+    if room_checkpoints.pop(room_id, None) is not None: queue_file_job(get_checkpoint_path(room_id), remove_file, get_checkpoint_path(room_id))
+
+def room_checkpointer():
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    while True:
+        settings = CONFIG.get('checkpoints', {})
+        if settings.get('enabled', True):
+            for room_id in list(room_actors): send_to_room(room_id, checkpoint_room, room_id)
+        socketio.sleep(settings.get('interval_seconds', 5))
+
+def restore_room_checkpoints():
+    """Reconstruit les salles depuis leurs points de reprise. Les joueurs restent déconnectés jusqu'à leur retour :
+    passé le délai de grâce habituel, ceux qui ne reviennent pas sont retirés."""
+    settings = CONFIG.get('checkpoints', {})
+    if not settings.get('enabled', True) or not os.path.isdir(CHECKPOINT_DIR): return
+    now = time.time()
+    for filename in sorted(os.listdir(CHECKPOINT_DIR)):
+        room_id, ext = os.path.splitext(filename)
+        path = os.path.join(CHECKPOINT_DIR, filename)
+        if ext != '.json' or room_id in game_states: continue
+        if now - os.path.getmtime(path) > settings.get('max_age_seconds', 3600):
+            remove_file(path); continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f: text = f.read()
+            checkpoint = json.loads(text)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Point de reprise %s illisible, ignoré : %s", filename, e); continue
+        state = create_new_game_state()
+        step_pending = checkpoint.pop('step_pending', False)
+        state['question_bank_session'] = {'seen': decode_question_bitmap(checkpoint.pop('seen', '')), 'served': decode_question_bitmap(checkpoint.pop('served', ''))}
+        answers = checkpoint.pop('estimation_answers', None)
+        state.update(checkpoint)
+        if answers: state['estimation_answers'] = {'values': array('d', answers['values']), 'awaiting': set(answers['awaiting']), 'revealed': answers['revealed']}
+        if state['current_question_data']: state['audience_votes'] = {'counts': [0] * len(state['current_question_data'].get('reponses', [])), 'voters': set()}
+        if state['buzzer_active']: open_buzzer(state)
+        state['host_sid'] = None; state['last_activity'] = now
+        game_states[room_id] = state; room_checkpoints[room_id] = text
+        room_actors[room_id] = RoomActor(room_id)
+        for player in state['players']:
+            player['is_disconnected'] = True; player['disconnected_at'] = now
+            schedule_player_expiry(room_id, player)
+        # L'étape planifiée (question suivante, changement de mode...) est perdue : on laisse aux joueurs le temps de revenir.
+        if step_pending: schedule_room_step(room_id, settings.get('resume_delay_seconds', 15), advance_room, room_id)
+        broadcast_room_list(room_id)
+        logger.info("Salle %s restaurée (%d joueurs, %s).", room_id, len(state['players']), state['lifecycle'], extra={'room_id': room_id})
+
+def replace_player_sid(state, old_sid, new_sid):
+    """Reporte le sid d'un joueur reconnecté partout où l'état de la salle le référence."""
+    if state['buzzer_winner_sid'] == old_sid: state['buzzer_winner_sid'] = new_sid
+    state['buzzer_has_answered'] = [new_sid if sid == old_sid else sid for sid in state['buzzer_has_answered']]
+    if state['stop_or_encore_state'].get('sid') == old_sid: state['stop_or_encore_state']['sid'] = new_sid
+    answers = state['estimation_answers']
+    if answers and old_sid in answers['awaiting']:
+        answers['awaiting'].discard(old_sid); answers['awaiting'].add(new_sid)
+
+# --- DRAIN ET RELÈVE ---
+# Un drain refuse les nouvelles salles, laisse finir les parties en cours (jusqu'au délai), fige les salles restantes dans
+# leurs points de reprise, vide les écritures en attente puis arrête le serveur. Un processus lancé avec
+# QUIZ_TAKEOVER=<pid de l'ancien serveur> attend le marqueur de fin de drain de ce processus-là pour charger les données,
+# reprendre les salles et ouvrir le port : les clients se reconnectent seuls.
+HANDOFF_FILE = os.path.join(CHECKPOINT_DIR, 'handoff.ready')
+drain_requested = threading.Event()  # posé depuis n'importe quel thread (lancer_serveur.py) ou gestionnaire de signal
+drain_forced = threading.Event()  # second signal : on n'attend plus la fin des parties, elles sont figées telles quelles
+DRAIN_STATE = {'active': False, 'started_at': None}
+DRAIN_MESSAGE = "Le serveur redémarrera après les parties en cours."
+# Arrêt du serveur web en fin de drain : SystemExit fait sortir socketio.run (eventlet) ; serveur_asgi.py fournit le sien.
+stop_web_server = None
+
+def read_handoff_marker():
+    try:
+        with open(HANDOFF_FILE, 'r', encoding='utf-8') as f: return json.load(f)
+    except (OSError, json.JSONDecodeError): return None
+
+def wait_for_handoff():
+    """Avant tout chargement. Démarrage normal : un marqueur laissé par un arrêt précédent est périmé, on le supprime.
+    Relève (QUIZ_TAKEOVER=<pid>) : on attend le marqueur écrit par ce processus-là, après notre propre lancement."""
+    takeover_pid = os.environ.get('QUIZ_TAKEOVER')
+    if not takeover_pid:
+        remove_file(HANDOFF_FILE)
+        return
+    started_at = time.time()
+    logger.info("Relève : en attente de la fin du drain de l'ancien serveur (pid %s)...", takeover_pid)
+    while True:
+        marker = read_handoff_marker()
+        if marker and str(marker.get('pid')) == takeover_pid and marker.get('at', 0) >= started_at: break
+        time.sleep(0.2)
+    remove_file(HANDOFF_FILE)
+
+def request_drain():
+    """Premier appel (SIGTERM, bouton) : drain ; appel suivant : drain forcé, sans attendre la fin des parties."""
+    if drain_requested.is_set(): drain_forced.set()
+    else: drain_requested.set()
+
+def drain_watcher():
+    while not drain_requested.is_set(): socketio.sleep(1)
+    drain_server()
+
+def drain_server():
+    DRAIN_STATE['active'] = True; DRAIN_STATE['started_at'] = time.time()
+    logger.info("Drain : plus de nouvelles salles, fin des parties en cours...")
+    socketio.emit('server_draining', {'message': DRAIN_MESSAGE})
+    broadcast_to_admins()
+    deadline = time.time() + CONFIG.get('drain', {}).get('timeout_seconds', 900)
+    while time.time() < deadline and not drain_forced.is_set() and any(state['lifecycle'] == 'playing' for state in list(game_states.values())):
+        socketio.sleep(1)
+    # Chaque salle restante écrit son point de reprise puis son acteur s'arrête : plus aucune modification ensuite.
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    remaining = set(room_actors)
+    for room_id, actor in list(room_actors.items()):
+        actor.send(checkpoint_room, room_id); actor.send(remaining.discard, room_id); actor.stop()
+    save_question_stats()
+    while remaining or file_jobs or worker_pool.pending: socketio.sleep(0.05)
+    worker_pool.shutdown()
+    # Écrit puis renommé : la relève ne lit jamais un marqueur à moitié écrit.
+    with open(HANDOFF_FILE + '.tmp', 'w', encoding='utf-8') as f: json.dump({'pid': os.getpid(), 'rooms': sorted(game_states), 'at': time.time()}, f)
+    os.replace(HANDOFF_FILE + '.tmp', HANDOFF_FILE)
+    logger.info("Drain terminé : %d salle(s) prête(s) pour la relève.", len(game_states))
+    socketio.emit('server_restarting', {'message': "Redémarrage du serveur, reconnexion automatique..."})
+    socketio.sleep(0.5)
+    if stop_web_server: stop_web_server()
+    else: raise SystemExit
+
+# Annuaire des salles tenu à jour salle par salle : seuls les clients abonnés (écran de choix de salle) reçoivent
+# la liste complète à l'abonnement, puis uniquement les entrées qui changent.
+ROOM_LIST_CHANNEL = 'room_list'
+room_directory = {}
 
 def get_simplified_rooms():
-    simplified = {}
-    for room_id, state in game_states.items():
-        simplified[room_id] = { "player_count": len([p for p in state['players'] if not p.get('is_disconnected')]), "is_started": state['game_started'] }
-    return simplified
+    return dict(room_directory)
 
-def broadcast_room_list():
-    socketio.emit('update_room_list', {'rooms': get_simplified_rooms()})
+def broadcast_room_list(room_id):
+    state = game_states.get(room_id)
+    entry = { "player_count": sum(1 for p in state['players'] if not p.get('is_disconnected')), "is_started": state['game_started'] } if state else None
+    if room_directory.get(room_id) == entry: return
+    if entry: room_directory[room_id] = entry
+    else: room_directory.pop(room_id, None)
+    socketio.emit('room_list_changed', {'rooms': {room_id: entry} if entry else {}, 'removed': [] if entry else [room_id]}, room=ROOM_LIST_CHANNEL)
+
+# --- ACTEURS DE SALLE ---
+# Chaque salle a sa boîte aux lettres, vidée dans l'ordre par une unique tâche de fond : deux événements d'une même
+# salle ne s'entrelacent jamais, et les salles avancent indépendamment les unes des autres, sans verrou commun.
+room_actors = {}
+room_step_tokens = itertools.count(1)
+
+class RoomActor:
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.inbox = socketio.server.eio.create_queue()
+        self.processed = 0; self.max_depth = 0; self.total_wait_ms = 0.0
+        socketio.start_background_task(self.run)
+
+    def send(self, func, *args):
+        self.inbox.put((func, args, time.perf_counter()))
+        self.max_depth = max(self.max_depth, self.inbox.qsize())
+
+    def send_later(self, delay, func, *args):
+        def deliver():
+            socketio.sleep(delay)
+            self.send(func, *args)
+        socketio.start_background_task(deliver)
+
+    def stop(self): self.inbox.put(None)
+
+    def run(self):
+        while True:
+            message = self.inbox.get()
+            if message is None: return
+            func, args, queued_at = message
+            self.total_wait_ms += (time.perf_counter() - queued_at) * 1000
+            self.processed += 1
+            # Une erreur ne doit pas arrêter la salle : on la signale et on passe au message suivant.
+            try: func(*args)
+            except Exception: logger.exception("Erreur dans la salle %s (%s)", self.room_id, getattr(func, '__name__', func), extra={'room_id': self.room_id})
+
+    def get_metrics(self):
+        return {'depth': self.inbox.qsize(), 'max_depth': self.max_depth, 'processed': self.processed,
+                'avg_wait_ms': round(self.total_wait_ms / self.processed, 2) if self.processed else 0}
+
+def send_to_room(room_id, func, *args):
+    actor = room_actors.get(room_id)
+    if actor: actor.send(func, *args)
+
+def room_event(handler):
+    """Fait exécuter un gestionnaire Socket.IO par l'acteur de la salle visée (data['room_id']), avec le contexte de la requête."""
+    @functools.wraps(handler)
+    def dispatch(data):
+        actor = room_actors.get(data.get('room_id')) if isinstance(data, dict) else None
+        # Salle inconnue : le gestionnaire se contente de répondre (erreur, échec de reconnexion...) sans rien modifier.
+        if actor is None: return handler(data if isinstance(data, dict) else {})
+        actor.send(copy_current_request_context(handler), data)
+    return dispatch
+
+def schedule_room_step(room_id, delay, func, *args):
+    """Planifie la suite du déroulé d'une salle (question suivante, changement de mode...) après une pause.
+    Jusque-là les réponses sont ignorées, et une étape planifiée ou forcée ensuite rend celle-ci caduque."""
+    token = game_states[room_id]['pending_step'] = next(room_step_tokens)
+    room_actors[room_id].send_later(delay, run_room_step, room_id, token, func, args)
+
+def run_room_step(room_id, token, func, args):
+    state = game_states.get(room_id)
+    if not state or state['pending_step'] != token: return
+    state['pending_step'] = None
+    func(*args)
+
+# Tas des échéances (deadline, room_id, sid) des joueurs déconnectés. Une entrée devient caduque si le joueur
+# s'est reconnecté entre-temps (son sid a changé) : elle est simplement ignorée au dépilement.
+disconnect_deadlines = []
+
+def schedule_player_expiry(room_id, player):
+    grace = CONFIG.get('room_lifecycle', {}).get('disconnect_grace_seconds', 300)
+    heapq.heappush(disconnect_deadlines, (player['disconnected_at'] + grace, room_id, player['sid']))
+
+def expire_disconnected_players(room_id, sids):
+    """Retire les joueurs toujours déconnectés à leur échéance, avec une seule notification pour la salle."""
+    state = game_states.get(room_id)
+    if not state: return
+    now = time.time()
+    grace = CONFIG.get('room_lifecycle', {}).get('disconnect_grace_seconds', 300)
+    removed = was_active = False
+    for sid in sids:
+        index = next((i for i, p in enumerate(state['players']) if p['sid'] == sid and p.get('is_disconnected')), None)
+        if index is None or now - state['players'][index]['disconnected_at'] < grace: continue
+        player, player_was_active = remove_player(room_id, state, index)
+        logger.info("Joueur déconnecté %s retiré de la salle %s.", player['name'], room_id, extra={'room_id': room_id, 'player': player['name']})
+        # remove_player libère aussi l'estimation en cours (joueur d'une salle restaurée qui n'est jamais revenu),
+        # et n'avance la salle que si le joueur avait réellement la main dans le mode en cours.
+        removed = True; was_active = was_active or player_was_active
+    if not removed: return
+    if not state['players']: close_game_room(room_id, "Tous les joueurs ont quitté la partie."); return
+    socketio.emit('update_state', get_public_state(state), room=room_id)
+    broadcast_to_admins(); broadcast_room_list(room_id)
+    if was_active: advance_room(room_id)
 
 def cleanup_disconnected_players():
+    """Dépile les échéances arrivées à terme et confie les retraits à l'acteur de chaque salle touchée."""
+    while True:
+        now = time.time()
+        expired = {}
+        while disconnect_deadlines and disconnect_deadlines[0][0] <= now:
+            _, room_id, sid = heapq.heappop(disconnect_deadlines)
+            expired.setdefault(room_id, []).append(sid)
+        for room_id, sids in expired.items(): send_to_room(room_id, expire_disconnected_players, room_id, sids)
+        # On dort jusqu'à la prochaine échéance, en se réveillant au moins chaque seconde pour les nouvelles entrées.
+        socketio.sleep(min(disconnect_deadlines[0][0] - time.time(), 1.0) if disconnect_deadlines else 1.0)
+
+# --- CYCLE DE VIE DES SALLES ---
+# Une salle passe par les états lobby -> playing -> finished, puis closed lorsqu'elle est retirée de game_states.
+DECK_ENTRY_BYTES = 200
+# Tailles mesurées au dernier passage du gestionnaire : le tableau de bord les relit sans resérialiser chaque salle.
+room_sizes = {}
+
+def estimate_room_size(state):
+    """Taille approximative d'une salle en octets : état public sérialisé + paquets de questions construits."""
+    deck_entries = sum(len(deck['entries']) for deck in state['question_bank_session'].values() if isinstance(deck, dict))
+    return len(json.dumps(get_public_state(state), ensure_ascii=False)) + deck_entries * DECK_ENTRY_BYTES
+
+# Modes où un seul joueur a la main, désigné par current_player_index ; au buzzer, c'est le gagnant du buzz.
+TURN_MODES = ('simple', 'intrus')
+BUZZER_MODES = ('buzzer', 'sudden_death')
+
+def stop_awaiting_estimation(room_id, state, sid):
+    """L'estimation en cours n'attend plus ce joueur ; s'il était le dernier attendu, les résultats sont révélés."""
+    answers = state['estimation_answers']
+    if not answers or sid not in answers['awaiting']: return
+    answers['awaiting'].discard(sid)
+    if not answers['awaiting'] and state['players']: reveal_estimation_results(room_id)
+
+def remove_player(room_id, state, index):
+    """Retire un joueur de la salle et renvoie (joueur, était_actif) : actif s'il avait la main pendant la partie.
+    Hors des modes à tour, current_player_index est un reste du dernier tour : il ne désigne personne."""
+    player = state['players'].pop(index)
+    stop_awaiting_estimation(room_id, state, player['sid'])
+    mode_key = state['current_mode_key']
+    if mode_key in TURN_MODES: was_active = index == state['current_player_index']
+    elif mode_key in BUZZER_MODES: was_active = player['sid'] == state.get('buzzer_winner_sid')
+    else: was_active = False
+    was_active = state['game_started'] and was_active
+    # On recule l'index du joueur courant pour que le tour suivant revienne au bon joueur.
+    if index <= state['current_player_index']: state['current_player_index'] -= 1
+    return player, was_active
+
+def close_game_room(room_id, reason=None):
+    state = game_states.pop(room_id, None)
+    if not state: return
+    actor = room_actors.pop(room_id, None)
+    if actor: actor.stop()
+    state['lifecycle'] = 'closed'
+    socketio.emit('room_closed', {'reason': reason}, room=room_id)
+    socketio.close_room(room_id); socketio.close_room(audience_room(room_id))
+    room_rate_buckets.pop(room_id, None); pending_reactions.pop(room_id, None)
+    discard_room_checkpoint(room_id)
+    logger.info("Salle %s fermée (%s).", room_id, reason or 'salle vide', extra={'room_id': room_id})
+    broadcast_to_admins(); broadcast_room_list(room_id)
+
+def room_lifecycle_manager():
+    """Ferme les salles terminées ou inactives depuis trop longtemps, puis fait respecter le budget mémoire."""
+    while True:
+        settings = CONFIG.get('room_lifecycle', {})
+        now = time.time()
+        ttls = {'lobby': settings.get('lobby_idle_ttl', 1800), 'playing': settings.get('playing_idle_ttl', 3600), 'finished': settings.get('finished_ttl', 600)}
+        for room_id, state in list(game_states.items()):
+            if now - state.get('last_activity', now) > ttls.get(state.get('lifecycle'), ttls['lobby']):
+                send_to_room(room_id, close_game_room, room_id, "La salle a été fermée pour inactivité.")
+
+        budget = settings.get('memory_budget_mb', 64) * 1024 * 1024
+        sizes = {room_id: estimate_room_size(state) for room_id, state in list(game_states.items())}
+        room_sizes.clear(); room_sizes.update(sizes)
+        total = sum(sizes.values())
+        if total > budget:
+            # Éviction LRU : les salles terminées d'abord, puis les lobbys ; une partie en cours n'est jamais évincée.
+            candidates = sorted((state.get('lifecycle') != 'finished', state.get('last_activity', 0), room_id) for room_id, state in list(game_states.items()) if state.get('lifecycle') != 'playing')
+            for _, _, room_id in candidates:
+                if total <= budget: break
+                total -= sizes[room_id]
+                send_to_room(room_id, close_game_room, room_id, "La salle a été fermée pour libérer de la mémoire.")
+            if total > budget: logger.warning("Budget mémoire des salles dépassé : %d Ko occupés par des parties en cours.", total // 1024)
+        socketio.sleep(settings.get('sweep_seconds', 30))
+
+def start_background_services():
+    """Lance les tâches de fond du serveur (à appeler une fois, avant socketio.run)."""
+    worker_pool.start()
+    socketio.start_background_task(room_lifecycle_manager)
+    socketio.start_background_task(cleanup_disconnected_players)
+    socketio.start_background_task(latency_sampler)
+    socketio.start_background_task(room_checkpointer)
+    socketio.start_background_task(drain_watcher)
+    socketio.start_background_task(overload_monitor)
+
+# --- LIMITATION DES EFFETS COSMÉTIQUES ---
+# Seaux à jetons : {sid ou salle: {type: [jetons, dernier_remplissage]}}
+sid_rate_buckets = {}
+room_rate_buckets = {}
+pending_reactions = {}
+RATE_LIMIT_STATS = {'dropped': {}, 'coalesced': 0}
+
+def take_rate_token(buckets, owner, kind, limit):
+    """Consomme un jeton du seau (owner, kind) ; les jetons se rechargent à `rate` par seconde, jusqu'à `burst`."""
+    rate, burst = limit.get('rate', 1), limit.get('burst', 1)
+    now = time.monotonic()
+    bucket = buckets.setdefault(owner, {}).setdefault(kind, [burst, now])
+    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+    bucket[1] = now
+    if bucket[0] < 1: return False
+    bucket[0] -= 1
+    return True
+
+def allow_cosmetic_event(sid, room_id, event_name):
+    """Un effet passe s'il reste un jeton pour l'expéditeur puis pour la salle ; sinon il est compté comme abandonné."""
+    limits = CONFIG.get('rate_limits', {})
+    allowed = take_rate_token(sid_rate_buckets, sid, 'effect', limits.get('effect_per_sid', {'rate': 1, 'burst': 3})) and \
+        take_rate_token(room_rate_buckets, room_id, 'effect', limits.get('effect_per_room', {'rate': 4, 'burst': 8}))
+    if not allowed:
+        RATE_LIMIT_STATS['dropped'][event_name] = RATE_LIMIT_STATS['dropped'].get(event_name, 0) + 1
+    return allowed
+
+def relay_room_effect(data, triggered_event):
+    room_id = data.get('room_id')
+    if room_id not in game_states: return
+    if is_overloaded(): count_shed(triggered_event); return
+    if allow_cosmetic_event(request.sid, room_id, triggered_event):
+        socketio.emit(triggered_event, {}, room=room_id)
+
+def queue_reaction(room_id, player, emoji):
+    """Regroupe les réactions d'une salle par emoji, tous joueurs confondus, pendant une courte fenêtre,
+    puis les envoie avec leur nombre (« ×12 ») et la liste des joueurs qui ont réagi."""
+    room_reactions = pending_reactions.get(room_id)
+    if room_reactions is None:
+        room_reactions = pending_reactions[room_id] = {}
+        socketio.start_background_task(flush_reactions, room_id)
+    reaction = room_reactions.get(emoji)
+    if reaction:
+        reaction['count'] += 1
+        RATE_LIMIT_STATS['coalesced'] += 1
+    else:
+        reaction = room_reactions[emoji] = {'emoji': emoji, 'count': 1, 'players': {}}
+    sender = reaction['players'].setdefault(player['sid'], {'sid': player['sid'], 'name': player['name'], 'count': 0})
+    sender['count'] += 1
+
+def flush_reactions(room_id):
+    delay = CONFIG.get('rate_limits', {}).get('reaction_coalesce_ms', 200) / 1000
+    # En délestage, la fenêtre s'allonge : moins d'envois, des compteurs plus gros.
+    if is_overloaded(): delay *= CONFIG.get('overload', {}).get('shed_coalesce_factor', 5)
+    socketio.sleep(delay)
+    for reaction in pending_reactions.pop(room_id, {}).values():
+        socketio.emit('show_reaction', dict(reaction, players=list(reaction['players'].values())), room=room_id)
+
+# --- CONTRÔLE DE SURCHARGE ---
+# Une sonde mesure le retard de la boucle (réveil tardif d'un sleep) et la plus longue file d'acteur de salle. Au-delà
+# des seuils, le serveur se déleste de ce qui n'est pas du jeu. Niveau 1 (délestage) : effets cosmétiques abandonnés,
+# réactions regroupées plus longtemps, flux admin suspendu. Niveau 2 (critique) : en plus, réactions abandonnées et
+# création de salle refusée. Les parties en cours gardent ainsi leur budget de latence.
+OVERLOAD_LEVELS = ('normal', 'shedding', 'critical')
+OVERLOAD_SMOOTHING = 0.3
+OVERLOAD_STATE = {'level': 0, 'lag_ms': 0.0, 'queue_depth': 0, 'calm_since': None}
+OVERLOAD_STATS = {'shed': {}, 'refused_rooms': 0, 'admin_updates_skipped': 0, 'level_changes': 0, 'overloaded_seconds': 0.0}
+
+def is_overloaded(level=1): return OVERLOAD_STATE['level'] >= level
+
+def count_shed(event_name): OVERLOAD_STATS['shed'][event_name] = OVERLOAD_STATS['shed'].get(event_name, 0) + 1
+
+def get_overload_target(settings):
+    if not settings.get('enabled', True): return 0
+    lag, depth = OVERLOAD_STATE['lag_ms'], OVERLOAD_STATE['queue_depth']
+    if lag >= settings.get('critical_lag_ms', 250) or depth >= settings.get('critical_queue_depth', 100): return 2
+    if lag >= settings.get('shed_lag_ms', 50) or depth >= settings.get('shed_queue_depth', 20): return 1
+    return 0
+
+def set_overload_level(level):
+    previous = OVERLOAD_STATE['level']
+    OVERLOAD_STATE['level'] = level; OVERLOAD_STATS['level_changes'] += 1
+    log = logger.warning if level > previous else logger.info
+    log("Charge : %s -> %s (retard de boucle %.0f ms, file la plus longue %d).", OVERLOAD_LEVELS[previous], OVERLOAD_LEVELS[level],
+        OVERLOAD_STATE['lag_ms'], OVERLOAD_STATE['queue_depth'])
+    # Même flux suspendu, les admins voient chaque changement de niveau ; à la reprise, les versions des sections
+    # leur font recharger ce qui a changé entre-temps.
+    summary = get_admin_summary()
+    for sid in list(admin_sids): socketio.emit('update_admin_view', summary, room=sid)
+
+def overload_monitor():
+    while True:
+        settings = CONFIG.get('overload', {})
+        interval = settings.get('sample_interval_ms', 100) / 1000
+        start = time.perf_counter()
+        socketio.sleep(interval)
+        elapsed = time.perf_counter() - start
+        # Moyenne glissante : un pic isolé (sauvegarde, ramasse-miettes) ne suffit pas à délester.
+        lag_ms = max(0.0, elapsed - interval) * 1000
+        OVERLOAD_STATE['lag_ms'] += OVERLOAD_SMOOTHING * (lag_ms - OVERLOAD_STATE['lag_ms'])
+        OVERLOAD_STATE['queue_depth'] = max((actor.inbox.qsize() for actor in list(room_actors.values())), default=0)
+        if OVERLOAD_STATE['level']: OVERLOAD_STATS['overloaded_seconds'] += elapsed
+        target = get_overload_target(settings)
+        if target > OVERLOAD_STATE['level']:
+            OVERLOAD_STATE['calm_since'] = None; set_overload_level(target)
+        elif target == OVERLOAD_STATE['level']: OVERLOAD_STATE['calm_since'] = None
+        # Hystérésis : on ne redescend qu'après recover_seconds passées sous le seuil du niveau courant.
+        elif OVERLOAD_STATE['calm_since'] is None: OVERLOAD_STATE['calm_since'] = time.monotonic()
+        elif time.monotonic() - OVERLOAD_STATE['calm_since'] >= settings.get('recover_seconds', 5):
+            OVERLOAD_STATE['calm_since'] = None; set_overload_level(target)
+
+def get_overload_metrics():
+    return {'level': OVERLOAD_LEVELS[OVERLOAD_STATE['level']], 'lag_ms': round(OVERLOAD_STATE['lag_ms'], 1),
+            'queue_depth': OVERLOAD_STATE['queue_depth'], 'shed': dict(OVERLOAD_STATS['shed']),
+            'refused_rooms': OVERLOAD_STATS['refused_rooms'], 'admin_updates_skipped': OVERLOAD_STATS['admin_updates_skipped'],
+            'level_changes': OVERLOAD_STATS['level_changes'], 'overloaded_seconds': round(OVERLOAD_STATS['overloaded_seconds'], 1)}
+
+# --- DIAGNOSTICS (PANNEAU ADMIN) ---
+# Outils à chaud, sans redémarrage ni débogueur : profil par échantillonnage des piles, différence d'instantanés
+# tracemalloc et mémoire occupée par chaque salle.
+PROFILE_STATE = {'running': False}
+MEMORY_SNAPSHOTS = {'previous': None}
+# Taille de la banque de questions et identifiants de ses objets : la banque ne change qu'à ses sauvegardes
+# (save_questions vide ce cache), inutile de la reparcourir à chaque rapport.
+QUESTION_BANK_MEMORY = {'bytes': None, 'ids': frozenset()}
+# Clés de l'état d'une salle regroupées pour le décompte mémoire ; les autres sont comptées dans « other ».
+ROOM_MEMORY_GROUPS = {
+    'question_bank_session': ('question_bank_session', 'question_queue', 'answer_key', 'current_question_data'),
+    'players': ('players', 'audience'),
+    'history': ('revealed_answers', 'buzzer_has_answered', 'estimation_answers', 'audience_votes', 'stop_or_encore_state'),
+}
+
+def describe_code(code): return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample_stacks(seconds, interval):
+    """Relève la pile de chaque autre thread toutes les `interval` secondes et compte les piles identiques, au format
+    « collapsed » des flamegraphs. Sous eventlet, le thread principal montre le greenlet en cours, ou le hub s'il attend."""
+    sampler = threading.get_ident()
+    stacks = {}; samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler: continue
+            frames = []
+            while frame: frames.append(describe_code(frame.f_code)); frame = frame.f_back
+            key = ';'.join([names.get(ident, f'thread-{ident}')] + frames[::-1])
+            stacks[key] = stacks.get(key, 0) + 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+def run_profiler(sid, seconds):
+    settings = CONFIG.get('diagnostics', {})
+    result = {}
+    def sample(): result['stacks'], result['samples'] = sample_stacks(seconds, settings.get('sample_interval_ms', 5) / 1000)
+    # Un vrai thread, et non une tâche de fond : sous eventlet, il observe le hub de l'extérieur.
+    sampler = threading.Thread(target=sample, name='profiler', daemon=True)
+    sampler.start()
+    while sampler.is_alive(): socketio.sleep(0.2)
+    PROFILE_STATE['running'] = False
+    stacks = result.get('stacks', {})
+    self_samples = {}
+    for key, count in stacks.items():
+        leaf = key.rsplit(';', 1)[-1]
+        self_samples[leaf] = self_samples.get(leaf, 0) + count
+    total = sum(stacks.values()) or 1
+    top = [{'function': name, 'samples': count, 'percent': round(100 * count / total, 1)}
+           for name, count in heapq.nlargest(settings.get('top', 25), self_samples.items(), key=lambda item: item[1])]
+    collapsed = ''.join(f"{key} {count}\n" for key, count in sorted(stacks.items()))
+    logger.info("Profil de %d s terminé : %d relevés.", seconds, result.get('samples', 0))
+    socketio.emit('admin_profile_result', {'seconds': seconds, 'samples': result.get('samples', 0), 'top': top, 'collapsed': collapsed}, room=sid)
+
+def take_memory_snapshot(stop=False):
+    """Le premier appel démarre tracemalloc et sert de référence ; les suivants montrent ce qui a grossi depuis le précédent.
+    Le suivi ralentit chaque allocation : il reste actif jusqu'à l'appel avec stop=True."""
+    if stop:
+        tracemalloc.stop(); MEMORY_SNAPSHOTS['previous'] = None
+        return {'tracing': False, 'top': []}
+    settings = CONFIG.get('diagnostics', {})
+    if not tracemalloc.is_tracing(): tracemalloc.start(settings.get('tracemalloc_frames', 1))
+    snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap>')))
+    previous = MEMORY_SNAPSHOTS['previous']; MEMORY_SNAPSHOTS['previous'] = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    stats = snapshot.compare_to(previous, 'lineno') if previous else snapshot.statistics('lineno')
+    top = [{'where': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", 'size_kb': round(stat.size / 1024, 1),
+            'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1), 'count': stat.count, 'count_diff': getattr(stat, 'count_diff', stat.count)}
+           for stat in stats[:settings.get('top', 25)]]
+    return {'tracing': True, 'baseline': previous is None, 'traced_kb': current // 1024, 'peak_kb': peak // 1024, 'top': top}
+
+def deep_sizeof(obj, seen, shared=frozenset()):
+    """Octets occupés par obj et tout ce qu'il référence ; un objet déjà dans seen ou dans shared (par id) n'est pas recompté."""
+    if id(obj) in seen or id(obj) in shared: return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict): size += sum(deep_sizeof(key, seen, shared) + deep_sizeof(value, seen, shared) for key, value in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)): size += sum(deep_sizeof(item, seen, shared) for item in list(obj))
+    return size
+
+def get_question_bank_memory():
+    if QUESTION_BANK_MEMORY['bytes'] is None:
+        ids = set()
+        QUESTION_BANK_MEMORY.update(bytes=deep_sizeof(QUESTION_BANK, ids), ids=frozenset(ids))
+    return QUESTION_BANK_MEMORY
+
+def send_room_memory_report(sid):
+    """Mémoire de chaque salle par groupe de clés. Les questions partagées avec la banque ne sont comptées qu'une fois, dans la banque.
+    Tâche de fond : le parcours rend la main entre deux salles, et le rapport part à l'admin qui l'a demandé."""
+    bank = get_question_bank_memory()
+    report = {'question_bank_bytes': bank['bytes'], 'rooms': {}}
+    grouped = {key for keys in ROOM_MEMORY_GROUPS.values() for key in keys}
+    for room_id, state in sorted(list(game_states.items())):
+        socketio.sleep(0)
+        seen = set()
+        groups = {group: sum(deep_sizeof(state[key], seen, bank['ids']) for key in keys if key in state) for group, keys in ROOM_MEMORY_GROUPS.items()}
+        groups['other'] = sys.getsizeof(state) + sum(deep_sizeof(value, seen, bank['ids']) for key, value in list(state.items()) if key not in grouped)
+        report['rooms'][room_id] = {'lifecycle': state['lifecycle'], 'players': len(state['players']), 'total_bytes': sum(groups.values()),
+                                    'groups': groups, 'checkpoint_bytes': len(room_checkpoints.get(room_id, '').encode('utf-8'))}
+    socketio.emit('admin_room_memory', report, room=sid)
+
+# --- ARBITRAGE DU BUZZER ---
+# Chaque buzz est horodaté à son arrivée (perf_counter_ns). Le premier ouvre une courte fenêtre d'arbitrage ;
+# à sa fermeture, le buzz le plus ancien gagne, après correction optionnelle de la latence propre à chaque client.
+# client_clocks sert aussi à la télémétrie : fenêtre glissante des allers-retours et transport de chaque sid.
+# Seuls les échanges de synchronisation (marqués « sync ») alimentent l'estimation du décalage utilisée par le buzzer ;
+# les sondes périodiques de la télémétrie ne font qu'enrichir la fenêtre.
+client_clocks = {}
+connected_sids = set()
+
+def sync_client_clock(sid, samples=3):
+    """Mesure l'aller-retour et le décalage d'horloge d'un client par quelques échanges ping/pong."""
+    for _ in range(samples):
+        socketio.emit('clock_sync_ping', {'server_ms': time.perf_counter_ns() / 1e6, 'sync': True}, room=sid)
+        socketio.sleep(0.5)
+
+def record_clock_sample(sid, server_ms, client_ms, sync=False):
+    rtt_ms = time.perf_counter_ns() / 1e6 - server_ms
+    if not 0 <= rtt_ms < 5000 or sid not in connected_sids: return
+    clock = client_clocks.get(sid)
+    if not clock:
+        clock = client_clocks[sid] = {'rtt_ms': None, 'offset_ms': None, 'measured_at': 0, 'transport': None, 'samples': deque(maxlen=CONFIG.get('telemetry', {}).get('window', 20))}
+    clock['samples'].append(rtt_ms)
+    try: clock['transport'] = socketio.server.transport(sid, '/')
+    except KeyError: pass  # session Engine.IO déjà fermée
+    if not sync: return
+    # On garde l'échantillon au plus court aller-retour : c'est celui dont le décalage estimé est le plus fiable.
+    if clock['rtt_ms'] is not None and clock['rtt_ms'] <= rtt_ms and time.time() - clock['measured_at'] < 60: return
+    clock.update(rtt_ms=rtt_ms, offset_ms=client_ms - (server_ms + rtt_ms / 2), measured_at=time.time())
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else None
+
+def get_room_latency(state):
+    """p50/p95 des allers-retours récents des joueurs, de l'hôte et du public d'une salle."""
+    sids = [p['sid'] for p in state['players']] + [state['host_sid']] + list(state['audience'])
+    samples = [rtt for sid in sids if sid in client_clocks for rtt in client_clocks[sid]['samples']]
+    p50, p95 = percentile(samples, 0.5), percentile(samples, 0.95)
+    return {'p50_ms': round(p50) if p50 is not None else None, 'p95_ms': round(p95) if p95 is not None else None,
+            'polling_count': sum(1 for sid in sids if client_clocks.get(sid, {}).get('transport') == 'polling')}
+
+def latency_sampler():
+    """Sonde périodiquement les membres des salles (joueurs, hôte, public) et signale les joueurs restés en long-polling.
+    Les autres clients connectés (panneau admin, liste des salles) ne répondent pas aux sondes."""
     while True:
-        with json_lock:
-            for room_id, state in list(game_states.items()):
-                original_player_count = len(state['players'])
-                state['players'] = [p for p in state['players'] if not p.get('is_disconnected') or (time.time() - p.get('disconnected_at', 0)) < 300]
-                if len(state['players']) < original_player_count:
-                    print(f"Nettoyage des joueurs déconnectés dans la salle {room_id}")
-                    socketio.emit('update_state', state, room=room_id)
-                    broadcast_to_admins(); broadcast_room_list()
-        socketio.sleep(60)
+        for room_id, state in list(game_states.items()):
+            for player in state['players']:
+                on_polling = client_clocks.get(player['sid'], {}).get('transport') == 'polling'
+                if on_polling and not player.get('on_polling'): logger.info("Joueur %s (salle %s) connecté en long-polling.", player['name'], room_id, extra={'room_id': room_id, 'player': player['name']})
+                player['on_polling'] = on_polling
+        sids = {sid for state in list(game_states.values()) for sid in [p['sid'] for p in state['players']] + [state['host_sid']] + list(state['audience'])}
+        ping = {'server_ms': time.perf_counter_ns() / 1e6}
+        for sid in sids & connected_sids: socketio.emit('clock_sync_ping', ping, room=sid)
+        socketio.sleep(CONFIG.get('telemetry', {}).get('ping_interval_seconds', 10))
+
+def get_buzz_press_ns(sid, arrival_ns, client_ms):
+    """Instant estimé de l'appui, sur l'horloge du serveur, jamais avant arrivée - aller-retour (borné)."""
+    buzzer_config = CONFIG.get('buzzer', {})
+    clock = client_clocks.get(sid)
+    if not buzzer_config.get('compensate_latency', True) or not clock or clock['rtt_ms'] is None: return arrival_ns
+    max_shift_ns = min(clock['rtt_ms'], buzzer_config.get('max_compensation_ms', 150)) * 1e6
+    if isinstance(client_ms, (int, float)):
+        press_ns = (client_ms - clock['offset_ms']) * 1e6
+    else:
+        press_ns = arrival_ns - clock['rtt_ms'] * 1e6 / 2
+    return int(min(arrival_ns, max(arrival_ns - max_shift_ns, press_ns)))
+
+def open_buzzer(state):
+    state['buzzer_active'] = True; state['buzzer_winner_sid'] = None
+    state['buzzer_opened_ns'] = time.perf_counter_ns(); state['buzz_window'] = None
+
+def resolve_buzz_window(room_id, window):
+    state = game_states.get(room_id)
+    if not state or state['buzz_window'] is not window: return
+    state['buzz_window'] = None
+    players_by_sid = {p['sid']: p for p in state['players']}
+    buzzes = sorted((press_ns, sid) for sid, press_ns in window.items() if sid in players_by_sid)
+    if not buzzes: return
+    for press_ns, sid in buzzes:
+        clock = client_clocks.get(sid)
+        reaction_ms = max(0, int((press_ns - state['buzzer_opened_ns']) / 1e6 - (clock['rtt_ms'] / 2 if clock and clock['rtt_ms'] is not None else 0)))
+        player = players_by_sid[sid]
+        player['buzz_count'] = player.get('buzz_count', 0) + 1
+        player['buzz_reaction_total_ms'] = player.get('buzz_reaction_total_ms', 0) + reaction_ms
+        if reaction_ms < player.get('best_buzz_ms', float('inf')): player['best_buzz_ms'] = reaction_ms
+    winner = players_by_sid[buzzes[0][1]]
+    winner['buzz_wins'] = winner.get('buzz_wins', 0) + 1
+    state['buzzer_active'] = False; state['buzzer_winner_sid'] = winner['sid']
+    state['info_text'] = f"{winner['name']} a buzzé !"
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id); broadcast_to_admins()
+    for p in state['players']:
+        is_my_turn = p['sid'] == winner['sid']
+        if is_my_turn: socketio.emit('update_player_view', {'view': 'question', 'data': {'question': state['current_question_data'], 'is_my_turn': True}, 'state': public_state}, room=p['sid'])
+        else: socketio.emit('update_player_view', { 'view': 'wait', 'data': {'message': f"{winner['name']} a buzzé !", 'question': state['current_question_data']}, 'state': public_state}, room=p['sid'])
+
+# --- PUBLIC (MODE AUDIENCE) ---
+# Au-delà des candidats, les spectateurs ne reçoivent que les diffusions de la salle (jamais d'envoi par sid)
+# et leurs votes sont agrégés en histogramme, envoyé au plus une fois par intervalle.
+pending_histograms = set()
+
+def audience_room(room_id):
+    return f"{room_id}:audience"
+
+def join_audience(room_id, state, name):
+    audience_config = CONFIG.get('audience', {})
+    if len(state['audience']) >= audience_config.get('max_audience', 200): emit('error', {'message': 'Le public est complet.'}); return
+    state['audience'][request.sid] = name
+    state['audience_count'] = len(state['audience'])
+    join_room(room_id); join_room(audience_room(room_id))
+    emit('joined_successfully', {'name': name, 'room_id': room_id, 'audience': True})
+    if state['game_started'] and state['current_question_data']:
+        view = 'estimation' if state['current_mode_key'] == 'estimation' else 'question'
+        emit('update_player_view', {'view': view, 'data': {'question': state['current_question_data'], 'is_my_turn': False}, 'state': get_public_state(state)})
+
+def leave_audience(state, sid):
+    del state['audience'][sid]
+    state['audience_count'] = len(state['audience'])
+
+def queue_audience_histogram(room_id):
+    if room_id in pending_histograms: return
+    pending_histograms.add(room_id)
+    socketio.start_background_task(flush_audience_histogram, room_id)
+
+def flush_audience_histogram(room_id):
+    socketio.sleep(CONFIG.get('audience', {}).get('histogram_interval_ms', 500) / 1000)
+    pending_histograms.discard(room_id)
+    state = game_states.get(room_id)
+    if not state or not state['audience_votes']: return
+    votes = state['audience_votes']
+    socketio.emit('audience_histogram', {'question_seq': state['question_seq'], 'counts': votes['counts'], 'total': len(votes['voters'])}, room=room_id)
+
+# --- RESSOURCES STATIQUES ---
+# Bibliothèques, polices et feuille Tailwind précompilée sont produites par construire_assets.py dans static/build/,
+# sous un nom contenant l'empreinte de leur contenu. Sans build, les pages retombent sur les CDN d'origine.
+ASSET_MANIFEST_FILE = os.path.join('static', 'build', 'manifest.json')
+ASSET_SOURCES = {
+    'socket.io.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.7.5/socket.io.min.js',
+    'qrcode.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js',
+    'Tone.js': 'https://cdnjs.cloudflare.com/ajax/libs/tone/14.7.77/Tone.js',
+    'confetti.browser.min.js': 'https://cdn.jsdelivr.net/npm/canvas-confetti@1.9.2/dist/confetti.browser.min.js',
+    'inter.css': 'https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;900&display=swap',
+    'press-start-2p.css': 'https://fonts.googleapis.com/css2?family=Press+Start+2P&display=swap',
+}
+
+def load_asset_manifest():
+    try:
+        with open(ASSET_MANIFEST_FILE, 'r', encoding='utf-8') as f: return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError): return {}
+
+ASSET_MANIFEST = load_asset_manifest()
+
+@app.template_global()
+def asset_url(name):
+    built = ASSET_MANIFEST.get(name)
+    return url_for('static', filename=built) if built else ASSET_SOURCES[name]
+
+# Seuls les bruitages courts du jeu sont préchargés ; musiques et sons d'easter eggs se chargent à la demande.
+PRELOADED_SOUNDS = {'correct', 'incorrect'}
+MUSIC_SOUNDS = {'lobby_music', 'retro-music', 'vaporwave-music', 'son-ambiance-film-1-253767', 'jingle-bells-bells-only-181672'}
+BUTTON_SOUNDS = {'has_fart_button': 'lorie', 'has_sewing_button': 'sewing', 'has_chair_button': 'chair-hit', 'has_axe_button': 'axe-clash', 'has_punch_button': 'punch-bell', 'has_branch_button': 'growing-branch'}
+# Son d'entrée d'un joueur spécial, rejoué au clic sur sa carte dans la salle d'attente.
+ENTRANCE_SOUNDS = {'has_belt_border': 'wrestling-bell', 'has_shield_border': 'war-horn', 'has_ring_border': 'rocky-theme', 'has_bark_border': 'i-am-groot'}
+
+def get_player_sounds(player):
+    return [sound for flag, sound in {**BUTTON_SOUNDS, **ENTRANCE_SOUNDS}.items() if player.get(flag)]
+
+@app.template_global()
+def sound_tag(element_id, sound, loop=False):
+    """Balise <audio> d'un son : variantes transcodées du manifeste (Opus, AAC) avant le MP3 d'origine."""
+    variants = ASSET_MANIFEST.get('sounds', {}).get(sound, {}).get('sources', [])
+    sources = ''.join(f'<source src="{url_for("static", filename=v["path"])}" type="{v["type"]}">' for v in variants)
+    sources += f'<source src="{url_for("static", filename=f"sounds/{sound}.mp3")}" type="audio/mpeg">'
+    preload = 'auto' if sound in PRELOADED_SOUNDS else 'none'
+    return Markup(f'<audio id="{element_id}" data-sound="{sound}"{" loop" if loop else ""} preload="{preload}">{sources}</audio>')
+
+@app.template_global()
+def tailwind_tags():
+    if 'tailwind.css' in ASSET_MANIFEST: return Markup(f'<link rel="stylesheet" href="{asset_url("tailwind.css")}">')
+    return Markup('<script src="https://cdn.tailwindcss.com"></script>\n    <script>tailwind.config = { darkMode: \'class\' }</script>')
+
+@app.after_request
+def set_static_cache_headers(response):
+    if request.endpoint == 'static':
+        # Les fichiers empreintés ne changent jamais sous le même nom ; les autres (sons, avatars) se revalident par ETag.
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if request.path.startswith('/static/build/') else 'public, max-age=86400'
+    return response
 
 # --- ROUTES HTTP ---
 def get_seasonal_theme():
@@ -222,75 +1271,342 @@ def stats_page():
     }
     return render_template('stats.html', game_title=CONFIG.get('game_title', 'Quiz Night Arena'), leaderboards=leaderboards)
 
+# --- TIRAGE PONDÉRÉ DES QUESTIONS ---
+class FenwickSampler:
+    """Tirage pondéré sans remise en O(log n), à l'aide d'un arbre de Fenwick sur les poids."""
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = [float(w) for w in weights]
+        self.tree = [0.0] * (self.size + 1)
+        for i, weight in enumerate(self.weights, 1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size: self.tree[parent] += self.tree[i]
+        self.total = sum(self.weights)
+        self.top_step = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def update(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self):
+        """Tire un indice proportionnellement à son poids puis le retire. Renvoie None si tout a été tiré."""
+        if self.total <= 1e-9: return None
+        target = random.random() * self.total
+        position, step = 0, self.top_step
+        while step:
+            candidate = position + step
+            if candidate <= self.size and self.tree[candidate] <= target:
+                position = candidate
+                target -= self.tree[candidate]
+            step >>= 1
+        if position >= self.size or self.weights[position] <= 0:
+            # Dérive des flottants : on se rabat sur le premier poids restant.
+            position = next((i for i, weight in enumerate(self.weights) if weight > 0), None)
+            if position is None:
+                self.total = 0.0
+                return None
+        self.update(position, 0.0)
+        return position
+
+QUESTION_TYPES = {'simple': 'questions_simples', 'buzzer': 'questions_simples', 'sudden_death': 'questions_simples', 'intrus': 'questions_intrus', 'estimation': 'questions_estimation'}
+
+def get_question_key(q_type, question):
+    """Identifiant stable d'une question, dérivé de son contenu et non de sa position dans le fichier."""
+    if q_type == 'questions_intrus':
+        text = question.get('theme', '') + '|' + '|'.join(sorted(ans.get('texte', '') for ans in question.get('reponses', [])))
+    else:
+        text = question.get('question', '')
+    return hashlib.sha1(f"{q_type}|{text.lower().strip()}".encode('utf-8')).hexdigest()[:12]
+
+def iter_bank_questions():
+    """Parcourt toute la banque sous la forme (type, thème ou None, question)."""
+    for theme, questions in QUESTION_BANK.get('questions_simples', {}).items():
+        for question in questions: yield 'questions_simples', theme, question
+    for q_type in ('questions_intrus', 'questions_estimation'):
+        for question in QUESTION_BANK.get(q_type, []): yield q_type, None, question
+
+def get_question_number(key):
+    """Numéro stable et jamais réattribué d'une question : sa position dans les bitmaps « déjà vues » des joueurs."""
+    number = QUESTION_IDS.get(key)
+    if number is None:
+        number = QUESTION_IDS[key] = len(QUESTION_IDS)
+    return number
+
+def encode_question_bitmap(bits):
+    """Sérialise un ensemble de numéros de questions (un entier utilisé comme bitmap) en texte compressé."""
+    if not bits: return ''
+    return base64.b64encode(zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))).decode('ascii')
+
+def decode_question_bitmap(text):
+    if not text: return 0
+    try:
+        return int.from_bytes(zlib.decompress(base64.b64decode(text)), 'little')
+    except (ValueError, zlib.error):
+        return 0
+
+def create_question_bank_session(players=()):
+    """Paquets de questions d'une salle, construits à la demande.
+
+    L'union des bitmaps « déjà vues » des joueurs (un simple OU binaire) écarte les questions qu'ils ont déjà eues ;
+    `served` accumule celles de la partie pour les leur ajouter à la fin."""
+    seen = 0
+    for player in players:
+        seen |= decode_question_bitmap(PLAYER_STATS.get(player['name'].lower(), {}).get('seen_questions'))
+    return {'seen': seen, 'served': 0}
+
+def get_question_weight(key, theme_size=1):
+    """Poids de tirage : favorise les questions peu servies et celles dont le taux de réussite est dans la cible."""
+    sampler_config = CONFIG.get('question_sampler', {})
+    served, answered, correct, _ = QUESTION_STATS.get(key, (0, 0, 0, 0))
+    weight = 1.0 / theme_size
+    weight /= (1 + served) ** sampler_config.get('novelty_exponent', 0.5)
+    if answered >= sampler_config.get('min_answers', 5):
+        low, high = sampler_config.get('target_correct_rate', [0.3, 0.85])
+        if not low <= correct / answered <= high:
+            weight *= sampler_config.get('out_of_band_factor', 0.25)
+    return weight
+
+def build_question_deck(q_type, seen=0):
+    """Paquet d'une salle pour un type de questions : questions actives des thèmes retenus, avec leur poids.
+
+    Les questions présentes dans le bitmap `seen` ont un poids nul, sauf si toutes les questions ont déjà été vues."""
+    entries = []
+    if q_type == 'questions_simples':
+        active_themes = CONFIG.get('active_themes', {}).get('simples', [])
+        for theme, questions in QUESTION_BANK.get(q_type, {}).items():
+            if active_themes and theme not in active_themes: continue
+            active_questions = [q for q in questions if q.get('active', True)]
+            # Chaque thème pèse autant au total, comme l'ancien tirage « thème puis question ».
+            entries.extend((get_question_key(q_type, q), theme, q, len(active_questions)) for q in active_questions)
+    else:
+        active_themes = CONFIG.get('active_themes', {}).get('intrus', []) if q_type == 'questions_intrus' else []
+        for q in QUESTION_BANK.get(q_type, []):
+            if not q.get('active', True) or (active_themes and q.get('theme') not in active_themes): continue
+            entries.append((get_question_key(q_type, q), None, q, 1))
+    weights = [get_question_weight(key, theme_size) for key, _, _, theme_size in entries]
+    if seen:
+        seen_bytes = seen.to_bytes((seen.bit_length() + 7) // 8, 'little')
+        unseen_weights = []
+        for (key, _, _, _), weight in zip(entries, weights):
+            number = get_question_number(key)
+            is_seen = (number >> 3) < len(seen_bytes) and (seen_bytes[number >> 3] >> (number & 7)) & 1
+            unseen_weights.append(0.0 if is_seen else weight)
+        if any(unseen_weights): weights = unseen_weights
+    return {'entries': [(key, theme, q) for key, theme, q, _ in entries], 'sampler': FenwickSampler(weights)}
+
+# --- RECHERCHE DE QUESTIONS (ADMIN) ---
+SEARCH_STOPWORDS = {'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'et', 'ou', 'en', 'au', 'aux', 'est', 'sont', 'qui', 'que', 'quel', 'quelle', 'quels', 'quelles', 'dans', 'sur', 'par', 'pour', 'il', 'elle', 'ce', 'cette', 'son', 'sa', 'ses', 'a', 't'}
+# Poids d'un mot selon le champ où il apparaît, et part du score accordée aux correspondances approchées.
+SEARCH_FIELD_WEIGHTS = {'question': 3.0, 'theme': 2.0, 'answer': 1.0}
+SEARCH_PREFIX_FACTOR = 0.6
+SEARCH_TRIGRAM_FACTOR = 0.4
+SEARCH_MIN_SIMILARITY = 0.45
+
+def normalize_search_text(text):
+    """Minuscules sans accents (« Élysée » -> « elysee ») puis découpage en mots."""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return re.findall(r'[a-z0-9]+', ''.join(c for c in text if not unicodedata.combining(c)))
+
+def get_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def get_search_fields(q_type, theme, question):
+    """Textes indexés d'une question, par champ : énoncé, thème et réponses."""
+    fields = [('theme', theme or question.get('theme', ''))]
+    if 'question' in question: fields.append(('question', question['question']))
+    for answer in question.get('reponses', []): fields.append(('answer', answer.get('texte', '')))
+    if 'reponse' in question: fields.append(('answer', f"{question['reponse']} {question.get('unite', '')}"))
+    return fields
+
+class QuestionSearchIndex:
+    """Index inversé de la banque de questions, tenu à jour question par question (ajout, modification, suppression)."""
+    def __init__(self):
+        self.documents = {}    # numéro de document -> (type, thème, question)
+        self.doc_ids = {}      # id(question) -> numéro de document
+        self.postings = {}     # mot -> {numéro de document: poids}
+        self.vocabulary = []   # mots triés, pour la recherche par préfixe
+        self.trigrams = {}     # trigramme -> mots qui le contiennent, pour les fautes de frappe
+        self.next_doc_id = 0
+
+    def rebuild(self):
+        self.__init__()
+        for q_type, theme, question in iter_bank_questions(): self.add(q_type, theme, question)
+
+    def add(self, q_type, theme, question):
+        doc_id = self.next_doc_id; self.next_doc_id += 1
+        self.documents[doc_id] = (q_type, theme, question)
+        self.doc_ids[id(question)] = doc_id
+        for field, text in get_search_fields(q_type, theme, question):
+            for word in normalize_search_text(text):
+                if word in SEARCH_STOPWORDS: continue
+                postings = self.postings.get(word)
+                if postings is None:
+                    postings = self.postings[word] = {}
+                    bisect.insort(self.vocabulary, word)
+                    for trigram in get_trigrams(word): self.trigrams.setdefault(trigram, set()).add(word)
+                postings[doc_id] = max(postings.get(doc_id, 0.0), SEARCH_FIELD_WEIGHTS[field])
+
+    def remove(self, question):
+        doc_id = self.doc_ids.pop(id(question), None)
+        if doc_id is None: return
+        q_type, theme, _ = self.documents.pop(doc_id)
+        for field, text in get_search_fields(q_type, theme, question):
+            for word in normalize_search_text(text):
+                postings = self.postings.get(word)
+                if not postings or postings.pop(doc_id, None) is None or postings: continue
+                # Plus aucune question ne contient ce mot : on l'oublie complètement.
+                del self.postings[word]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, word)]
+                for trigram in get_trigrams(word):
+                    words = self.trigrams[trigram]; words.discard(word)
+                    if not words: del self.trigrams[trigram]
+
+    def expand_term(self, term):
+        """Mots de l'index correspondant à un terme de recherche, avec leur coefficient : exact, préfixe puis trigrammes."""
+        matches = {term: 1.0} if term in self.postings else {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for word in itertools.islice(self.vocabulary, start, None):
+            if not word.startswith(term): break
+            matches.setdefault(word, SEARCH_PREFIX_FACTOR)
+        if len(term) >= 3:
+            term_trigrams = get_trigrams(term)
+            shared = {}
+            for trigram in term_trigrams:
+                for word in self.trigrams.get(trigram, ()): shared[word] = shared.get(word, 0) + 1
+            for word, count in shared.items():
+                similarity = count / (len(term_trigrams) + len(get_trigrams(word)) - count)
+                if similarity >= SEARCH_MIN_SIMILARITY and word not in matches: matches[word] = SEARCH_TRIGRAM_FACTOR * similarity
+        return matches
+
+    def search(self, query, q_type=None):
+        """Documents contenant tous les termes de la requête (au moins approximativement), du plus pertinent au moins pertinent."""
+        terms = [word for word in normalize_search_text(query) if word not in SEARCH_STOPWORDS]
+        if not terms: return []
+        scores = None
+        for term in dict.fromkeys(terms):
+            term_scores = {}
+            for word, factor in self.expand_term(term).items():
+                for doc_id, weight in self.postings[word].items():
+                    if weight * factor > term_scores.get(doc_id, 0.0): term_scores[doc_id] = weight * factor
+            scores = term_scores if scores is None else {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores: return []
+        hits = [doc_id for doc_id in scores if q_type is None or self.documents[doc_id][0] == q_type]
+        # À score égal, l'ordre d'insertion (celui des fichiers) départage.
+        hits.sort(key=lambda doc_id: (-scores[doc_id], doc_id))
+        return hits
+
+    def describe(self, doc_id):
+        """Résultat affichable par le panneau admin, avec la position actuelle de la question dans la banque."""
+        q_type, theme, question = self.documents[doc_id]
+        questions = QUESTION_BANK.get(q_type, {}).get(theme, []) if q_type == 'questions_simples' else QUESTION_BANK.get(q_type, [])
+        index = next((i for i, q in enumerate(questions) if q is question), None)
+        return {'type': q_type, 'theme': theme, 'index': index, 'question': question}
+
+question_search_index = QuestionSearchIndex()
+
 # --- LOGIQUE DE JEU ---
 def get_local_question(mode_key, session_bank):
+    q_type = QUESTION_TYPES[mode_key]
+    deck = session_bank.get(q_type)
+    index = deck['sampler'].sample() if deck else None
+    if index is None:
+        # Paquet épuisé ou pas encore construit : on repart de la banque, sans les questions déjà vues s'il en reste d'autres.
+        deck = session_bank[q_type] = build_question_deck(q_type, session_bank.get('seen', 0) | session_bank.get('served', 0))
+        index = deck['sampler'].sample()
+        if index is None: return None
+    key, theme, question = deck['entries'][index]
+    question = dict(question, qid=key)
+    if theme: question['theme'] = theme
+    return question
+
+def prepare_question_view(mode_key, question_data):
+    """Construit la vue publique d'une question (réponses mélangées, sans correction) et sa clé de correction.
+
+    La question de la banque n'est jamais modifiée : la vue est un nouvel objet, construit une seule fois
+    et partagé par tous les envois de la question. La clé de correction reste dans l'état côté serveur."""
+    public_question = {key: value for key, value in question_data.items() if key not in ('reponses', 'reponse', 'tolerance', 'active', 'qid')}
+    qid = question_data.get('qid')
     if mode_key == 'estimation':
-        q_type = 'questions_estimation'
-        bank = session_bank.get(q_type, [])
-        if not bank:
-            session_bank[q_type] = copy.deepcopy(QUESTION_BANK.get(q_type, []))
-            bank = session_bank[q_type]
-        if not bank: return None
-        return bank.pop(random.randrange(len(bank)))
-
-    q_type = 'questions_simples' if mode_key in ['simple', 'buzzer', 'sudden_death'] else 'questions_intrus'
-    
-    if q_type == 'questions_simples':
-        bank = session_bank.get(q_type, {})
-        active_simple_themes = CONFIG.get('active_themes', {}).get('simples', [])
-        
-        all_themes_in_bank = {theme: [q for q in questions if q.get('active', True)] for theme, questions in bank.items()}
-        all_themes_in_bank = {theme: questions for theme, questions in all_themes_in_bank.items() if questions}
-
-        available_themes = list(all_themes_in_bank.keys())
-        if active_simple_themes:
-            available_themes = [theme for theme in available_themes if theme in active_simple_themes]
-
-        if not available_themes:
-            session_bank[q_type] = copy.deepcopy(QUESTION_BANK.get(q_type, {}))
-            bank = session_bank[q_type]
-            all_themes_in_bank = {theme: [q for q in questions if q.get('active', True)] for theme, questions in bank.items()}
-            all_themes_in_bank = {theme: questions for theme, questions in all_themes_in_bank.items() if questions}
-            available_themes = list(all_themes_in_bank.keys())
-            if active_simple_themes:
-                available_themes = [theme for theme in available_themes if theme in active_simple_themes]
-        
-        if not available_themes: return None
-        
-        chosen_theme = random.choice(available_themes)
-        questions_in_theme = all_themes_in_bank[chosen_theme]
-        question = questions_in_theme.pop(random.randrange(len(questions_in_theme)))
-        
-        original_bank_questions = session_bank[q_type][chosen_theme]
-        session_bank[q_type][chosen_theme] = [q for q in original_bank_questions if q != question]
-        if not session_bank[q_type][chosen_theme]: del session_bank[q_type][chosen_theme]
-
-        question['theme'] = chosen_theme
-        return question
+        return public_question, {'qid': qid, 'reponse': question_data['reponse'], 'tolerance': question_data.get('tolerance', 0)}
+    reponses = list(question_data['reponses'])
+    random.shuffle(reponses)
+    public_question['reponses'] = [{'texte': ans['texte']} for ans in reponses]
+    if mode_key == 'intrus':
+        return public_question, {'qid': qid, 'intrus_index': next((i for i, ans in enumerate(reponses) if ans.get('intrus')), -1)}
+    return public_question, {'qid': qid, 'correct_index': next((i for i, ans in enumerate(reponses) if ans.get('correcte')), -1)}
+
+def set_current_question(state, prepared):
+    """Installe une question préparée comme question courante de la salle et la compte comme servie."""
+    public_question, state['answer_key'] = prepared
+    state['current_question_data'] = public_question
+    state['question_shown_at'] = state['last_activity'] = time.time()
+    state['question_seq'] += 1
+    state['audience_votes'] = {'counts': [0] * len(public_question.get('reponses', [])), 'voters': set()}
+    qid = state['answer_key'].get('qid')
+    if qid:
+        QUESTION_STATS.setdefault(qid, [0, 0, 0, 0])[0] += 1
+        session_bank = state['question_bank_session']
+        session_bank['served'] = session_bank.get('served', 0) | (1 << get_question_number(qid))
+    return public_question
+
+def record_question_answer(state, is_correct):
+    """Comptabilise une réponse (justesse et temps de réponse) pour la question courante de la salle."""
+    qid = (state.get('answer_key') or {}).get('qid')
+    if not qid: return
+    stats = QUESTION_STATS.setdefault(qid, [0, 0, 0, 0])
+    stats[1] += 1
+    stats[2] += 1 if is_correct else 0
+    stats[3] += int((time.time() - state.get('question_shown_at', time.time())) * 1000)
+
+QUESTION_DRAW_ATTEMPTS = 10
+
+def validate_question(mode_key, question_data):
+    """Vérifie qu'une question tirée de la banque est jouable dans le mode donné."""
+    if not isinstance(question_data, dict): return False
+    if mode_key == 'estimation':
+        reponse = question_data.get('reponse')
+        return bool(question_data.get('question')) and isinstance(reponse, (int, float)) and not isinstance(reponse, bool)
+    reponses = question_data.get('reponses')
+    if not isinstance(reponses, list) or len(reponses) < 2: return False
+    if not all(isinstance(ans, dict) and ans.get('texte') for ans in reponses): return False
+    if mode_key == 'intrus': return sum(1 for ans in reponses if ans.get('intrus')) == 1
+    return bool(question_data.get('question')) and sum(1 for ans in reponses if ans.get('correcte')) == 1
+
+def draw_question_view(mode_key, session_bank):
+    """Tire une question valide de la banque de session et prépare sa vue publique."""
+    for _ in range(QUESTION_DRAW_ATTEMPTS):
+        question_data = get_local_question(mode_key, session_bank)
+        if not question_data: return None
+        if validate_question(mode_key, question_data): return prepare_question_view(mode_key, question_data)
+        logger.warning("Question invalide ignorée : %s", question_data.get('question') or question_data.get('theme'))
+    return None
 
-    else: # Intrus
-        full_bank = session_bank.get(q_type, [])
-        active_intrus_themes = CONFIG.get('active_themes', {}).get('intrus', [])
-        
-        bank = [q for q in full_bank if q.get('active', True)]
-        
-        if active_intrus_themes:
-            bank = [q for q in bank if q.get('theme') in active_intrus_themes]
-            
-        if not bank:
-            session_bank[q_type] = copy.deepcopy(QUESTION_BANK.get(q_type, []))
-            full_bank = session_bank[q_type]
-            bank = [q for q in full_bank if q.get('active', True)]
-            if active_intrus_themes:
-                bank = [q for q in bank if q.get('theme') in active_intrus_themes]
-                
-        if not bank: return None
-        
-        question_to_return = bank.pop(random.randrange(len(bank)))
-        
-        session_bank[q_type] = [q for q in session_bank[q_type] if q != question_to_return]
-        
-        return question_to_return
+def prefetch_questions(room_id):
+    """Complète la file des prochaines questions préparées pour le mode en cours de la salle."""
+    state = game_states.get(room_id)
+    if not state or not state['game_started']: return
+    remaining = state['mode_question_count'] - state['questions_answered_in_mode']
+    target = min(remaining, CONFIG.get('question_prefetch', 5))
+    while len(state['question_queue']) < target:
+        prepared = draw_question_view(state['current_mode_key'], state['question_bank_session'])
+        if not prepared: break
+        state['question_queue'].append(prepared)
+
+def next_question_view(room_id, state):
+    """Renvoie la prochaine question préparée ; la file est complétée en tâche de fond si besoin."""
+    if not state['question_queue']:
+        return draw_question_view(state['current_mode_key'], state['question_bank_session'])
+    prepared = state['question_queue'].pop(0)
+    if state['mode_question_count'] - state['questions_answered_in_mode'] > len(state['question_queue']):
+        send_to_room(room_id, prefetch_questions, room_id)
+    return prepared
 
 def get_next_player_index(state):
     active_players = [p for p in state['players'] if not p.get('is_disconnected')]
@@ -334,13 +1650,14 @@ def start_next_mode(room_id):
     name, count, task = mode_configs[state['current_mode_key']]
     state['info_text'] = f"Mode: {name}"
     state['mode_question_count'] = count
+    state['question_queue'] = []
+    prefetch_questions(room_id)
 
     if state['current_mode_key'] == 'buzzer':
         for p in state['players']: p['score_round'] = 0
 
     socketio.emit('show_mode_title', {'title': name}, room=room_id)
-    socketio.sleep(3)
-    socketio.start_background_task(task, room_id)
+    schedule_room_step(room_id, 3, task, room_id)
 
 def start_question_simple(room_id):
     state = game_states.get(room_id)
@@ -350,14 +1667,13 @@ def start_question_simple(room_id):
     state['current_player_index'] = get_next_player_index(state)
     current_player = state['players'][state['current_player_index']]
     state['info_text'] = f"Au tour de {current_player['name']}"
-    question_data = get_local_question('simple', state['question_bank_session'])
-    if not question_data: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', state, room=room_id); socketio.sleep(3); start_next_mode(room_id); return
-    random.shuffle(question_data['reponses'])
-    state['current_question_data'] = question_data
-    socketio.emit('update_state', state, room=room_id)
-    for p in state['players']:
-        is_my_turn = p['sid'] == current_player['sid']
-        socketio.emit('update_player_view', {'view': 'question', 'data': {'question': question_data, 'is_my_turn': is_my_turn}, 'state': state}, room=p['sid'])
+    prepared = next_question_view(room_id, state)
+    if not prepared: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', get_public_state(state), room=room_id); schedule_room_step(room_id, 3, start_next_mode, room_id); return
+    public_question = set_current_question(state, prepared)
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id)
+    socketio.emit('update_player_view', {'view': 'question', 'data': {'question': public_question, 'is_my_turn': False}, 'state': public_state}, room=room_id)
+    socketio.emit('turn_update', {'is_my_turn': True}, room=current_player['sid'])
 
 def start_question_buzzer(room_id):
     state = game_states.get(room_id)
@@ -368,15 +1684,16 @@ def start_question_buzzer(room_id):
         if winner and winner.get('score_round', 0) > 0:
             winner['has_multiplier'] = True; state['info_text'] = f"{winner['name']} gagne le bonus Score x2 !"
         else: state['info_text'] = "Pas de bonus ce tour-ci."
-        socketio.emit('update_state', state, room=room_id); socketio.sleep(3); start_next_mode(room_id); return
+        socketio.emit('update_state', get_public_state(state), room=room_id); schedule_room_step(room_id, 3, start_next_mode, room_id); return
     state['info_text'] = f"Question Bonus {state['questions_answered_in_mode']}/{state['mode_question_count']}"
-    state['buzzer_active'] = True; state['buzzer_winner_sid'] = None; state['buzzer_has_answered'] = []
-    question_data = get_local_question('buzzer', state['question_bank_session'])
-    if not question_data: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', state, room=room_id); socketio.sleep(3); start_next_mode(room_id); return
-    random.shuffle(question_data['reponses'])
-    state['current_question_data'] = question_data
-    socketio.emit('update_state', state, room=room_id)
-    socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': question_data}, 'state': state}, room=room_id)
+    state['buzzer_winner_sid'] = None; state['buzzer_has_answered'] = []
+    prepared = next_question_view(room_id, state)
+    if not prepared: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', get_public_state(state), room=room_id); schedule_room_step(room_id, 3, start_next_mode, room_id); return
+    public_question = set_current_question(state, prepared)
+    open_buzzer(state)
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id)
+    socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': public_question}, 'state': public_state}, room=room_id)
 
 def start_question_intrus(room_id):
     state = game_states.get(room_id)
@@ -386,15 +1703,14 @@ def start_question_intrus(room_id):
     state['current_player_index'] = get_next_player_index(state)
     current_player = state['players'][state['current_player_index']]
     state['info_text'] = f"Stop ou la Gaffe : Au tour de {current_player['name']}"
-    question_data = get_local_question('intrus', state['question_bank_session'])
-    if not question_data: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', state, room=room_id); socketio.sleep(3); start_next_mode(room_id); return
-    random.shuffle(question_data['reponses'])
-    state['current_question_data'] = question_data
+    prepared = next_question_view(room_id, state)
+    if not prepared: state['info_text'] = "Plus de questions !"; socketio.emit('update_state', get_public_state(state), room=room_id); schedule_room_step(room_id, 3, start_next_mode, room_id); return
+    public_question = set_current_question(state, prepared)
     state['stop_or_encore_state'] = {'sid': current_player['sid'], 'points_accumulated': 0, 'revealed': []}
-    socketio.emit('update_state', state, room=room_id)
-    for p in state['players']:
-        is_my_turn = p['sid'] == current_player['sid']
-        socketio.emit('update_player_view', {'view': 'question', 'data': {'question': question_data, 'is_my_turn': is_my_turn, 'revealed': []}, 'state': state}, room=p['sid'])
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id)
+    socketio.emit('update_player_view', {'view': 'question', 'data': {'question': public_question, 'is_my_turn': False, 'revealed': []}, 'state': public_state}, room=room_id)
+    socketio.emit('turn_update', {'is_my_turn': True}, room=current_player['sid'])
 
 def start_question_estimation(room_id):
     state = game_states.get(room_id)
@@ -407,30 +1723,40 @@ def start_question_estimation(room_id):
     
     state['info_text'] = f"Estimation {state['questions_answered_in_mode']}/{state['mode_question_count']}"
     
-    question_data = get_local_question('estimation', state['question_bank_session'])
-    if not question_data:
-        state['info_text'] = "Plus de questions !"; socketio.emit('update_state', state, room=room_id); socketio.sleep(3); start_next_mode(room_id); return
+    prepared = next_question_view(room_id, state)
+    if not prepared:
+        state['info_text'] = "Plus de questions !"; socketio.emit('update_state', get_public_state(state), room=room_id); schedule_room_step(room_id, 3, start_next_mode, room_id); return
     
-    state['current_question_data'] = question_data
+    public_question = set_current_question(state, prepared)
     for p in state['players']:
         p['current_answer'] = None
+    # Réponses collectées au fil de l'eau : la fin de la question se détecte quand plus aucun candidat n'est attendu.
+    state['estimation_answers'] = {'values': array('d'), 'awaiting': {p['sid'] for p in state['players'] if not p.get('is_disconnected')}, 'revealed': False}
 
-    socketio.emit('update_state', state, room=room_id)
-    socketio.emit('update_player_view', {'view': 'estimation', 'data': {'question': question_data}, 'state': state}, room=room_id)
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id)
+    socketio.emit('update_player_view', {'view': 'estimation', 'data': {'question': public_question}, 'state': public_state}, room=room_id)
 
 def start_sudden_death(room_id, tied_players):
     state = game_states.get(room_id)
     if not state: return
     state['current_mode_key'] = 'sudden_death'; state['info_text'] = "ÉGALITÉ ! Mort Subite !"
-    state['buzzer_active'] = True; state['buzzer_winner_sid'] = None; state['buzzer_has_answered'] = []
+    state['buzzer_active'] = False; state['buzzer_winner_sid'] = None; state['buzzer_has_answered'] = []
     state['players'] = [p for p in state['players'] if p['sid'] in [player['sid'] for player in tied_players]]
-    question_data = get_local_question('sudden_death', state['question_bank_session'])
-    state['current_question_data'] = question_data
+    prepared = draw_question_view('sudden_death', state['question_bank_session'])
+    public_question = set_current_question(state, prepared) if prepared else None
     socketio.emit('show_mode_title', {'title': "MORT SUBITE"}, room=room_id)
-    socketio.sleep(3)
-    socketio.emit('update_state', state, room=room_id)
+    schedule_room_step(room_id, 3, open_sudden_death_question, room_id, public_question)
+
+def open_sudden_death_question(room_id, public_question):
+    state = game_states.get(room_id)
+    if not state: return
+    open_buzzer(state)
+    public_state = get_public_state(state)
+    socketio.emit('update_state', public_state, room=room_id)
     for player in state['players']:
-        socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': question_data}, 'state': state}, room=player['sid'])
+        socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': public_question}, 'state': public_state}, room=player['sid'])
+    socketio.emit('update_player_view', {'view': 'question', 'data': {'question': public_question, 'is_my_turn': False}, 'state': public_state}, room=audience_room(room_id))
 
 def end_game(room_id):
     state = game_states.get(room_id)
@@ -441,8 +1767,10 @@ def end_game(room_id):
         start_sudden_death(room_id, winners)
         return
     state['game_started'] = False
+    broadcast_room_list(room_id)
     winner = max(state['players'], key=lambda p: p['score'], default=None)
     state['info_text'] = "Partie terminée !"
+    served_questions = state['question_bank_session'].get('served', 0)
 
     for player_data in state['players']:
         name_key = player_data['name'].lower()
@@ -455,12 +1783,19 @@ def end_game(room_id):
             }
         
         stats = PLAYER_STATS[name_key]
+        if served_questions:
+            stats['seen_questions'] = encode_question_bitmap(decode_question_bitmap(stats.get('seen_questions')) | served_questions)
         stats['games_played'] += 1
         stats['total_score'] += player_data['score']
         if player_data['score'] > stats.get('best_score', 0): stats['best_score'] = player_data['score']
         stats['score_simple'] = stats.get('score_simple', 0) + player_data.get('game_score_simple', 0)
         stats['score_buzzer'] = stats.get('score_buzzer', 0) + player_data.get('game_score_buzzer', 0)
         stats['score_intrus'] = stats.get('score_intrus', 0) + player_data.get('game_score_intrus', 0)
+        if player_data.get('buzz_count'):
+            stats['buzz_count'] = stats.get('buzz_count', 0) + player_data['buzz_count']
+            stats['buzz_wins'] = stats.get('buzz_wins', 0) + player_data.get('buzz_wins', 0)
+            stats['buzz_reaction_total_ms'] = stats.get('buzz_reaction_total_ms', 0) + player_data['buzz_reaction_total_ms']
+            stats['best_buzz_ms'] = min(stats.get('best_buzz_ms', player_data['best_buzz_ms']), player_data['best_buzz_ms'])
 
         if winner and player_data['sid'] == winner['sid']:
             stats['wins'] += 1
@@ -474,6 +1809,8 @@ def end_game(room_id):
             stats['win_streak'] = 0
 
     save_stats()
+    save_question_stats()
+    save_question_ids()
     
     game_result = {
         "date": datetime.now().strftime("%d/%m/%Y %H:%M"), "room_id": room_id,
@@ -482,59 +1819,99 @@ def end_game(room_id):
     }
     GAME_HISTORY.insert(0, game_result)
     save_history()
+    state['lifecycle'] = 'finished'; state['last_activity'] = time.time()
+    # Les paquets de questions ne servent plus : ils seront reconstruits si la salle relance une partie.
+    state['question_bank_session'] = create_question_bank_session(); state['question_queue'] = []
     socketio.emit('end_game', {'winner': winner}, room=room_id)
-    broadcast_to_admins()
+    notify_admins('rooms', 'history', 'stats')
 
 # --- GESTIONNAIRES D'ÉVÉNEMENTS SOCKET.IO ---
 @socketio.on('connect')
 def handle_connect():
-    print(f"Client connecté: {request.sid}")
+    logger.debug("Client connecté: %s", request.sid, extra={'sid': request.sid})
+    connected_sids.add(request.sid)
+    if DRAIN_STATE['active']: emit('server_draining', {'message': DRAIN_MESSAGE})
+
+@socketio.on('subscribe_room_list')
+def handle_subscribe_room_list():
+    join_room(ROOM_LIST_CHANNEL)
     emit('update_room_list', {'rooms': get_simplified_rooms()})
 
+@socketio.on('unsubscribe_room_list')
+def handle_unsubscribe_room_list():
+    leave_room(ROOM_LIST_CHANNEL)
+
 @socketio.on('disconnect')
 def handle_disconnect():
-    print(f"Client déconnecté: {request.sid}")
-    if request.sid in admin_sids: admin_sids.remove(request.sid)
+    logger.debug("Client déconnecté: %s", request.sid, extra={'sid': request.sid})
+    admin_sids.discard(request.sid)
+    sid_rate_buckets.pop(request.sid, None); client_clocks.pop(request.sid, None); connected_sids.discard(request.sid)
     for room, state in list(game_states.items()):
-        player = next((p for p in state["players"] if p.get("sid") == request.sid), None)
-        if player:
-            if state['game_started']:
-                player['is_disconnected'] = True; player['disconnected_at'] = time.time()
-                print(f"Joueur {player['name']} marqué comme déconnecté.")
-            else:
-                state["players"].remove(player)
-                if not state["players"]: del game_states[room]; print(f"Salle {room} supprimée.")
-            socketio.emit('update_state', state, room=room)
-            broadcast_to_admins(); broadcast_room_list(); break
+        if request.sid in state['audience'] or any(p.get('sid') == request.sid for p in state['players']):
+            send_to_room(room, handle_room_disconnect, room, request.sid); break
+
+def handle_room_disconnect(room, sid):
+    state = game_states.get(room)
+    if not state: return
+    if sid in state['audience']: leave_audience(state, sid); return
+    player = next((p for p in state["players"] if p.get("sid") == sid), None)
+    if not player: return
+    if state['game_started']:
+        player['is_disconnected'] = True; player['disconnected_at'] = time.time()
+        schedule_player_expiry(room, player)
+        stop_awaiting_estimation(room, state, sid)
+        logger.info("Joueur %s marqué comme déconnecté.", player['name'], extra={'room_id': room, 'player': player['name']})
+    else:
+        state["players"].remove(player)
+        if not state["players"]: close_game_room(room); return
+    socketio.emit('update_state', get_public_state(state), room=room)
+    broadcast_to_admins(); broadcast_room_list(room)
 
 @socketio.on('create_room_request')
 def handle_create_room_request():
+    if DRAIN_STATE['active']: emit('error', {'message': "Le serveur redémarre bientôt : impossible de créer une salle pour l'instant."}); return
+    if is_overloaded(2):
+        OVERLOAD_STATS['refused_rooms'] += 1
+        emit('error', {'message': "Le serveur est surchargé : les parties en cours sont prioritaires. Réessayez dans quelques instants."}); return
     room_id = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=4))
     while room_id in game_states: room_id = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=4))
     join_room(room_id)
     game_states[room_id] = create_new_game_state()
     game_states[room_id]['host_sid'] = request.sid
-    print(f"Salle {room_id} créée par {request.sid}.")
-    emit('room_created', {'room_id': room_id, 'config': CONFIG, 'state': game_states[room_id]})
-    broadcast_room_list()
+    room_actors[room_id] = RoomActor(room_id)
+    logger.info("Salle %s créée par %s.", room_id, request.sid, extra={'room_id': room_id, 'sid': request.sid})
+    emit('room_created', {'room_id': room_id, 'config': CONFIG, 'state': get_public_state(game_states[room_id])})
+    broadcast_room_list(room_id)
     broadcast_to_admins() 
 
 @socketio.on('host_join_room')
+@room_event
 def handle_host_join_room(data):
     room_id = data.get('room_id')
     if room_id in game_states:
         join_room(room_id)
         game_states[room_id]['host_sid'] = request.sid
-        print(f"Hôte {request.sid} a rejoint l'affichage de la salle {room_id}.")
-        emit('room_created', {'room_id': room_id, 'config': CONFIG, 'state': game_states[room_id]})
+        game_states[room_id]['last_activity'] = time.time()
+        logger.info("Hôte %s a rejoint l'affichage de la salle %s.", request.sid, room_id, extra={'room_id': room_id, 'sid': request.sid})
+        emit('room_created', {'room_id': room_id, 'config': CONFIG, 'state': get_public_state(game_states[room_id])})
+        # Partie en cours (hôte rechargé, serveur redémarré) : l'affichage repasse directement sur le jeu.
+        if game_states[room_id]['game_started']: emit('update_state', get_public_state(game_states[room_id]))
+        sounds = [sound for player in game_states[room_id]['players'] for sound in get_player_sounds(player)]
+        if sounds: emit('preload_sounds', {'sounds': sounds})
+    else: emit('room_closed', {'reason': "Cette salle n'existe plus."})  # Serveur redémarré sans elle : retour à la liste.
 
 @socketio.on('join_game')
+@room_event
 def handle_join_game(data):
     room_id = data.get('room_id'); player_name = data.get('name'); avatar_id = data.get('avatar_id')
     state = game_states.get(room_id)
     if not state: emit('error', {'message': 'Cette salle n\\\'existe pas.'}); return
+    audience_config = CONFIG.get('audience', {})
+    is_full = len([p for p in state['players'] if not p.get('is_disconnected')]) >= audience_config.get('max_contestants', 8)
+    if audience_config.get('enabled', True) and (data.get('audience') or state['game_started'] or is_full):
+        join_audience(room_id, state, str(player_name)[:30]); return
     if state['game_started']: emit('error', {'message': 'La partie a déjà commencé.'}); return
-    if len([p for p in state['players'] if not p.get('is_disconnected')]) >= 8: emit('error', {'message': 'La partie est pleine.'}); return
+    if is_full: emit('error', {'message': 'La partie est pleine.'}); return
     
     player_name_lower = player_name.lower().strip()
     active_easter_eggs = CONFIG.get('easter_eggs', {})
@@ -572,31 +1949,39 @@ def handle_join_game(data):
         "game_score_simple": 0, "game_score_buzzer": 0, "game_score_intrus": 0
     }
     state['players'].append(new_player)
+    state['last_activity'] = time.time()
     join_room(room_id)
     emit('joined_successfully', {'name': new_player['name'], 'color': new_player['color'], 'token': new_player['token'], 'room_id': room_id})
-    socketio.emit('update_state', state, room=room_id)
-    broadcast_to_admins(); broadcast_room_list()
+    socketio.start_background_task(sync_client_clock, request.sid)
+    socketio.emit('update_state', get_public_state(state), room=room_id)
+    broadcast_to_admins(); broadcast_room_list(room_id)
+    # Les sons des boutons spéciaux ne sont téléchargés par les écrans qu'à l'arrivée du joueur concerné.
+    if get_player_sounds(new_player): socketio.emit('preload_sounds', {'sounds': get_player_sounds(new_player)}, room=room_id)
 
 @socketio.on('reconnect_player')
+@room_event
 def handle_reconnect_player(data):
     token = data.get('token'); room_id = data.get('room_id')
     state = game_states.get(room_id)
     if state:
         player = next((p for p in state['players'] if p.get('token') == token), None)
         if player:
+            replace_player_sid(state, player['sid'], request.sid)
             player['sid'] = request.sid
             player['is_disconnected'] = False
             if 'disconnected_at' in player: del player['disconnected_at']
+            state['last_activity'] = time.time()
             join_room(room_id)
-            print(f"Joueur {player['name']} reconnecté avec succès.")
+            logger.info("Joueur %s reconnecté avec succès.", player['name'], extra={'room_id': room_id, 'player': player['name']})
             emit('reconnect_success', {'name': player['name'], 'color': player['color']})
-            socketio.emit('update_state', state, room=room_id)
-            broadcast_to_admins()
+            socketio.start_background_task(sync_client_clock, request.sid)
+            socketio.emit('update_state', get_public_state(state), room=room_id)
+            broadcast_to_admins(); broadcast_room_list(room_id)
             if state['game_started']:
                 mode = state['current_mode_key']
                 current_player_index = state.get('current_player_index', -1)
                 current_player = state['players'][current_player_index] if current_player_index != -1 else None
-                view_data = {'state': state}
+                view_data = {'state': get_public_state(state)}
                 if mode == 'simple':
                     is_my_turn = player['sid'] == current_player['sid'] if current_player else False
                     view_data['view'] = 'question'
@@ -616,34 +2001,39 @@ def handle_reconnect_player(data):
                     view_data['view'] = 'question'; view_data['data'] = {'question': state['current_question_data'], 'is_my_turn': is_my_turn, 'revealed': state['revealed_answers']}
                 else: view_data['view'] = 'wait'; view_data['data'] = {'message': 'Reconnecté ! En attente...'}
                 socketio.emit('update_player_view', view_data, room=request.sid)
-            else: socketio.emit('update_player_view', {'view': 'wait', 'data': {'message': 'Reconnecté ! En attente du début...'}, 'state': state}, room=request.sid)
+            else: socketio.emit('update_player_view', {'view': 'wait', 'data': {'message': 'Reconnecté ! En attente du début...'}, 'state': get_public_state(state)}, room=request.sid)
             return
     emit('reconnect_fail')
 
 @socketio.on('start_game')
+@room_event
 def handle_start_game(data):
     room_id = data.get('room_id')
     state = game_states.get(room_id)
-    if not state or not state.get('players'): return
+    if not state or not state.get('players') or state['game_started']: return
     state['game_started'] = True
+    state['lifecycle'] = 'playing'; state['last_activity'] = time.time()
+    state['question_bank_session'] = create_question_bank_session(state['players'])
     start_next_mode(room_id)
-    broadcast_room_list()
+    broadcast_room_list(room_id)
 
 @socketio.on('player_answer')
+@room_event
 def handle_player_answer(data):
     room_id = data.get('room_id'); state = game_states.get(room_id)
-    if not state or not state.get('current_question_data'): return
+    if not state or not state.get('current_question_data') or state['pending_step']: return
     player = next((p for p in state['players'] if p['sid'] == request.sid), None)
     if not player: return
     mode_key = state['current_mode_key']
     question = state['current_question_data']; answer_index = data.get('answer_index')
-    if not isinstance(answer_index, int) or answer_index >= len(question['reponses']): return
-    selected_answer = question['reponses'][answer_index]
+    if not isinstance(answer_index, int) or not 0 <= answer_index < len(question['reponses']): return
+    answer_key = state.get('answer_key') or {}
     
     points_config = CONFIG.get('points_config', {})
 
     if mode_key == 'simple':
-        is_correct = selected_answer['correcte']
+        is_correct = answer_index == answer_key.get('correct_index')
+        record_question_answer(state, is_correct)
         points = points_config.get('simple', 10)
         if player.get('has_multiplier') and data.get('use_multiplier'):
             points *= 2; player['has_multiplier'] = False
@@ -656,23 +2046,21 @@ def handle_player_answer(data):
             player['game_score_simple'] = player.get('game_score_simple', 0) + points
         
         socketio.emit('answer_feedback', {'correct': is_correct}, room=player['sid'])
-        correct_idx = next(i for i, ans in enumerate(question['reponses']) if ans['correcte'])
-        socketio.emit('reveal_answer', {'correct_answer_index': correct_idx, 'player_choice_index': answer_index, 'is_correct': is_correct}, room=room_id)
-        socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-        socketio.sleep(3); start_question_simple(room_id)
+        socketio.emit('reveal_answer', {'correct_answer_index': answer_key.get('correct_index'), 'player_choice_index': answer_index, 'is_correct': is_correct}, room=room_id)
+        socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+        schedule_room_step(room_id, 3, start_question_simple, room_id)
         
     elif mode_key == 'buzzer' or mode_key == 'sudden_death':
-        is_correct = selected_answer['correcte']
+        is_correct = answer_index == answer_key.get('correct_index')
+        record_question_answer(state, is_correct)
         socketio.emit('answer_feedback', {'correct': is_correct}, room=player['sid'])
         
         if mode_key == 'sudden_death':
             if is_correct: end_game(room_id)
             else:
                 player['score'] = -1
-                state['info_text'] = f"{player['name']} est éliminé !"; socketio.emit('update_state', state, room=room_id); socketio.sleep(3)
-                remaining_players = [p for p in state['players'] if p['score'] >= 0]
-                if len(remaining_players) <= 1: end_game(room_id)
-                else: start_sudden_death(room_id, remaining_players)
+                state['info_text'] = f"{player['name']} est éliminé !"; socketio.emit('update_state', get_public_state(state), room=room_id)
+                schedule_room_step(room_id, 3, continue_sudden_death, room_id)
             return
             
         if is_correct:
@@ -680,26 +2068,27 @@ def handle_player_answer(data):
             player['score_round'] = player.get('score_round', 0) + points
             player['game_score_buzzer'] = player.get('game_score_buzzer', 0) + points
             state['info_text'] = f"Bonne réponse de {player['name']} !"
-            correct_idx = next(i for i, ans in enumerate(question['reponses']) if ans['correcte'])
-            socketio.emit('reveal_answer', {'correct_answer_index': correct_idx, 'player_choice_index': answer_index, 'is_correct': True}, room=room_id)
-            socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-            socketio.sleep(3); start_question_buzzer(room_id)
+            socketio.emit('reveal_answer', {'correct_answer_index': answer_key.get('correct_index'), 'player_choice_index': answer_index, 'is_correct': True}, room=room_id)
+            socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+            schedule_room_step(room_id, 3, start_question_buzzer, room_id)
         else:
             state['info_text'] = f"{player['name']} s'est trompé ! Aux autres de buzzer !"
             state['buzzer_has_answered'].append(player['sid'])
-            state['buzzer_active'] = True; state['buzzer_winner_sid'] = None
+            open_buzzer(state)
             active_players = [p for p in state['players'] if not p.get('is_disconnected')]
             if len(state['buzzer_has_answered']) >= len(active_players):
-                state['info_text'] = "Personne n'a trouvé !"; correct_idx = next(i for i, ans in enumerate(question['reponses']) if ans['correcte'])
-                socketio.emit('reveal_answer', {'correct_answer_index': correct_idx, 'player_choice_index': -1, 'is_correct': False}, room=room_id)
-                socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-                socketio.sleep(3); start_question_buzzer(room_id)
+                state['info_text'] = "Personne n'a trouvé !"
+                socketio.emit('reveal_answer', {'correct_answer_index': answer_key.get('correct_index'), 'player_choice_index': -1, 'is_correct': False}, room=room_id)
+                socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+                schedule_room_step(room_id, 3, start_question_buzzer, room_id)
             else:
-                socketio.emit('update_state', state, room=room_id)
-                socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': state['current_question_data']}, 'state': state}, room=room_id)
+                public_state = get_public_state(state)
+                socketio.emit('update_state', public_state, room=room_id)
+                socketio.emit('update_player_view', {'view': 'buzzer', 'data': {'question': state['current_question_data']}, 'state': public_state}, room=room_id)
                 
     elif mode_key == 'intrus':
-        is_intrus = selected_answer['intrus']
+        is_intrus = answer_index == answer_key.get('intrus_index')
+        record_question_answer(state, not is_intrus)
         soe_state = state['stop_or_encore_state']
         soe_state['revealed'].append(answer_index)
         socketio.emit('answer_feedback', {'correct': not is_intrus}, room=player['sid'])
@@ -707,8 +2096,8 @@ def handle_player_answer(data):
         if is_intrus:
             state['info_text'] = f"Oh non ! {player['name']} a trouvé l'intrus."
             socketio.emit('reveal_answer', {'intrus_found': True, 'player_choice_index': answer_index}, room=room_id)
-            socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-            socketio.sleep(3); start_question_intrus(room_id)
+            socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+            schedule_room_step(room_id, 3, start_question_intrus, room_id)
         else:
             base_points = points_config.get('intrus', 50)
             points = base_points * (len(soe_state['revealed']))
@@ -718,29 +2107,41 @@ def handle_player_answer(data):
             
             soe_state['points_accumulated'] = points
             socketio.emit('reveal_answer', {'intrus_found': False, 'player_choice_index': answer_index}, room=room_id)
-            socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-            socketio.sleep(2)
-            
-            nombre_bonnes_reponses = len(question['reponses']) - 1
-            if len(soe_state['revealed']) == nombre_bonnes_reponses:
-                player['score'] += soe_state['points_accumulated']
-                player['game_score_intrus'] = player.get('game_score_intrus', 0) + soe_state['points_accumulated']
-                
-                name_key = player['name'].lower()
-                if name_key in PLAYER_STATS:
-                    PLAYER_STATS[name_key]['grand_slams'] = PLAYER_STATS[name_key].get('grand_slams', 0) + 1
-                    save_stats()
+            socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+            schedule_room_step(room_id, 2, continue_intrus_turn, room_id, player)
 
-                state['info_text'] = f"Grand chelem ! {player['name']} valide {soe_state['points_accumulated']} points !"
-                socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-                socketio.sleep(3)
-                start_question_intrus(room_id)
-            else: socketio.emit('update_player_view', {'view': 'stop_or_encore', 'data': soe_state, 'state': state}, room=player['sid'])
+def continue_sudden_death(room_id):
+    state = game_states.get(room_id)
+    if not state: return
+    remaining_players = [p for p in state['players'] if p['score'] >= 0]
+    if len(remaining_players) <= 1: end_game(room_id)
+    else: start_sudden_death(room_id, remaining_players)
+
+def continue_intrus_turn(room_id, player):
+    """Après une bonne réponse à l'intrus : grand chelem si tout est révélé, sinon le joueur choisit stop ou encore."""
+    state = game_states.get(room_id)
+    if not state: return
+    soe_state = state['stop_or_encore_state']
+    nombre_bonnes_reponses = len(state['current_question_data']['reponses']) - 1
+    if len(soe_state['revealed']) == nombre_bonnes_reponses:
+        player['score'] += soe_state['points_accumulated']
+        player['game_score_intrus'] = player.get('game_score_intrus', 0) + soe_state['points_accumulated']
+        
+        name_key = player['name'].lower()
+        if name_key in PLAYER_STATS:
+            PLAYER_STATS[name_key]['grand_slams'] = PLAYER_STATS[name_key].get('grand_slams', 0) + 1
+            save_stats()
+
+        state['info_text'] = f"Grand chelem ! {player['name']} valide {soe_state['points_accumulated']} points !"
+        socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+        schedule_room_step(room_id, 3, start_question_intrus, room_id)
+    else: socketio.emit('update_player_view', {'view': 'stop_or_encore', 'data': soe_state, 'state': get_public_state(state)}, room=player['sid'])
 
 @socketio.on('player_stop_or_encore')
+@room_event
 def handle_stop_or_encore(data):
     room_id = data.get('room_id'); state = game_states.get(room_id)
-    if not state: return
+    if not state or state['pending_step']: return
     player = next((p for p in state['players'] if p['sid'] == request.sid), None)
     if not player: return
     choice = data.get('choice')
@@ -750,30 +2151,40 @@ def handle_stop_or_encore(data):
         player['score'] += points_won
         player['game_score_intrus'] = player.get('game_score_intrus', 0) + points_won
         state['info_text'] = f"{player['name']} s'arrête et valide {points_won} points !"
-        socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-        socketio.sleep(3); start_question_intrus(room_id)
-    else: socketio.emit('update_player_view', {'view': 'question', 'data': {'question': state['current_question_data'], 'is_my_turn': True, 'revealed': soe_state['revealed']}, 'state': state}, room=player['sid'])
+        socketio.emit('update_state', get_public_state(state), room=room_id); broadcast_to_admins()
+        schedule_room_step(room_id, 3, start_question_intrus, room_id)
+    else: socketio.emit('update_player_view', {'view': 'question', 'data': {'question': state['current_question_data'], 'is_my_turn': True, 'revealed': soe_state['revealed']}, 'state': get_public_state(state)}, room=player['sid'])
 
 @socketio.on('player_buzz')
 def handle_player_buzz(data):
-    room_id = data.get('room_id'); state = game_states.get(room_id)
-    if not state or not state['buzzer_active'] or request.sid in state.get('buzzer_has_answered', []): return
-    state['buzzer_active'] = False; state['buzzer_winner_sid'] = request.sid
-    winner = next(p for p in state['players'] if p['sid'] == request.sid)
-    state['info_text'] = f"{winner['name']} a buzzé !"
-    socketio.emit('update_state', state, room=room_id); broadcast_to_admins()
-    for p in state['players']:
-        is_my_turn = p['sid'] == winner['sid']
-        if is_my_turn: socketio.emit('update_player_view', {'view': 'question', 'data': {'question': state['current_question_data'], 'is_my_turn': True}, 'state': state}, room=p['sid'])
-        else: socketio.emit('update_player_view', { 'view': 'wait', 'data': {'message': f"{winner['name']} a buzzé !", 'question': state['current_question_data']}, 'state': state}, room=p['sid'])
+    # L'instant d'arrivée est relevé dès la réception, avant l'éventuelle attente dans la file de la salle.
+    arrival_ns = time.perf_counter_ns()
+    if isinstance(data, dict): send_to_room(data.get('room_id'), record_player_buzz, data.get('room_id'), request.sid, arrival_ns, data.get('client_ts'))
+
+def record_player_buzz(room_id, sid, arrival_ns, client_ts):
+    state = game_states.get(room_id)
+    if not state or not state['buzzer_active'] or state['pending_step'] or sid in state.get('buzzer_has_answered', []): return
+    if not any(p['sid'] == sid for p in state['players']): return
+    window = state['buzz_window']
+    if window is None:
+        window = state['buzz_window'] = {}
+        room_actors[room_id].send_later(CONFIG.get('buzzer', {}).get('arbitration_window_ms', 40) / 1000, resolve_buzz_window, room_id, window)
+    if sid not in window: window[sid] = get_buzz_press_ns(sid, arrival_ns, client_ts)
+
+@socketio.on('clock_sync_pong')
+def handle_clock_sync_pong(data):
+    if all(isinstance(data.get(key), (int, float)) for key in ('server_ms', 'client_ms')):
+        record_clock_sample(request.sid, data['server_ms'], data['client_ms'], data.get('sync') is True)
 
 @socketio.on('player_estimation')
+@room_event
 def handle_player_estimation(data):
     room_id = data.get('room_id'); state = game_states.get(room_id)
     if not state: return
     
     player = next((p for p in state['players'] if p['sid'] == request.sid), None)
-    if not player or player.get('current_answer') is not None:
+    answers = state['estimation_answers']
+    if not player or not answers or answers['revealed'] or player.get('current_answer') is not None:
         return
 
     try:
@@ -781,96 +2192,205 @@ def handle_player_estimation(data):
         socketio.emit('player_answered', {'sid': request.sid}, room=room_id)
     except (ValueError, TypeError):
         return
+    answer_key = state.get('answer_key') or {}
+    if 'reponse' in answer_key:
+        record_question_answer(state, abs(player['current_answer'] - answer_key['reponse']) <= answer_key.get('tolerance', 0))
+    answers['values'].append(player['current_answer'])
+    stop_awaiting_estimation(room_id, state, request.sid)
 
-    active_players = [p for p in state['players'] if not p.get('is_disconnected')]
-    if all(p.get('current_answer') is not None for p in active_players):
-        reveal_estimation_results(room_id)
+def get_estimation_points(diff, tolerance):
+    points_config = CONFIG.get('points_config', {})
+    if diff == 0: return points_config.get('estimation_perfect', 150)
+    if tolerance > 0 and diff <= tolerance:
+        base_points = points_config.get('estimation_close', 100)
+        return max(10, base_points - int((diff / tolerance) * (base_points - 10)))
+    return 0
+
+def summarize_estimations(values, correct_answer):
+    """Résumé compact de toutes les estimations (candidats et public) : médiane et histogramme à pas fixe."""
+    if not values: return {'count': 0, 'median': None, 'histogram': None}
+    bucket_count = CONFIG.get('estimation_reveal', {}).get('buckets', 10)
+    low, high = min(min(values), correct_answer), max(max(values), correct_answer)
+    width = (high - low) / bucket_count or 1
+    counts = [0] * bucket_count
+    for value in values: counts[min(int((value - low) / width), bucket_count - 1)] += 1
+    return {'count': len(values), 'median': statistics.median(values), 'histogram': {'min': low, 'max': high, 'counts': counts}}
 
 def reveal_estimation_results(room_id):
     state = game_states.get(room_id)
     if not state: return
     
-    question = state['current_question_data']
+    answers = state['estimation_answers']
+    if not answers or answers['revealed']: return
+    answers['revealed'] = True
+    question = {**state['current_question_data'], **(state.get('answer_key') or {})}
     correct_answer = question['reponse']
     tolerance = question.get('tolerance', 0)
-    points_config = CONFIG.get('points_config', {})
     
-    for p in state['players']:
-        if p.get('current_answer') is not None:
-            diff = abs(p['current_answer'] - correct_answer)
-            if diff == 0:
-                p['score'] += points_config.get('estimation_perfect', 150)
-            elif tolerance > 0 and diff <= tolerance:
-                base_points = points_config.get('estimation_close', 100)
-                p['score'] += max(10, base_points - int((diff / tolerance) * (base_points - 10)))
+    answered = [p for p in state['players'] if p.get('current_answer') is not None]
+    for p in answered: p['score'] += get_estimation_points(abs(p['current_answer'] - correct_answer), tolerance)
     
     state['info_text'] = f"La bonne réponse était : {correct_answer}"
-    all_answers = [{'name': p['name'], 'answer': p['current_answer']} for p in state['players'] if p.get('current_answer') is not None]
+    answered.sort(key=lambda p: abs(p['current_answer'] - correct_answer))
+    closest = [{'name': p['name'], 'answer': p['current_answer']} for p in answered[:CONFIG.get('estimation_reveal', {}).get('closest', 8)]]
+    summary = summarize_estimations(answers['values'], correct_answer)
     
-    socketio.emit('reveal_estimation', {'question': question, 'all_answers': all_answers}, room=room_id)
-    socketio.emit('update_state', state, room=room_id)
+    socketio.emit('reveal_estimation', {'question': question, 'closest': closest, **summary}, room=room_id)
+    socketio.emit('update_state', get_public_state(state), room=room_id)
     broadcast_to_admins()
-    
-    socketio.sleep(8)
-    start_question_estimation(room_id)
+    schedule_room_step(room_id, 8, start_question_estimation, room_id)
 
 @socketio.on('play_fart_sound')
 def handle_fart_sound(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('fart_sound_triggered', {}, room=room_id)
+    relay_room_effect(data, 'fart_sound_triggered')
 
 @socketio.on('play_sewing_effect')
 def handle_sewing_effect(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('sewing_effect_triggered', {}, room=room_id)
+    relay_room_effect(data, 'sewing_effect_triggered')
 
 @socketio.on('play_chair_effect')
 def handle_chair_effect(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('chair_effect_triggered', {}, room=room_id)
+    relay_room_effect(data, 'chair_effect_triggered')
 
 @socketio.on('play_berserker_cry')
 def handle_berserker_cry(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('berserker_cry_triggered', {}, room=room_id)
+    relay_room_effect(data, 'berserker_cry_triggered')
 
 @socketio.on('play_punch_effect')
 def handle_punch_effect(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('punch_effect_triggered', {}, room=room_id)
+    relay_room_effect(data, 'punch_effect_triggered')
 
 @socketio.on('play_branch_effect')
 def handle_branch_effect(data):
-    room_id = data.get('room_id')
-    if room_id in game_states: socketio.emit('branch_effect_triggered', {}, room=room_id)
+    relay_room_effect(data, 'branch_effect_triggered')
 
 @socketio.on('player_reaction')
 def handle_player_reaction(data):
     room_id = data.get('room_id'); state = game_states.get(room_id)
     if state:
         player = next((p for p in state['players'] if p['sid'] == request.sid), None)
-        if player:
-            socketio.emit('show_reaction', {
-                'player_sid': request.sid,
-                'player_name': player['name'],
-                'emoji': data.get('emoji')
-            }, room=room_id)
+        if not player: return
+        if is_overloaded(2): count_shed('show_reaction'); return
+        emoji = str(data.get('emoji', ''))[:8]
+        limit = CONFIG.get('rate_limits', {}).get('reaction_per_sid', {'rate': 3, 'burst': 6})
+        pending = pending_reactions.get(room_id, {}).get(emoji)
+        # Rejoindre un emoji déjà en attente dans la salle ne coûte aucun envoi : seule une nouvelle entrée consomme un jeton.
+        # La part d'un joueur dans une même réaction reste bornée par sa rafale, pour qu'un seul joueur ne gonfle pas le compteur.
+        if pending: allowed = pending['players'].get(request.sid, {}).get('count', 0) < limit.get('burst', 1)
+        else: allowed = take_rate_token(sid_rate_buckets, request.sid, 'reaction', limit)
+        if not allowed:
+            RATE_LIMIT_STATS['dropped']['show_reaction'] = RATE_LIMIT_STATS['dropped'].get('show_reaction', 0) + 1
+            return
+        queue_reaction(room_id, player, emoji)
+
+@socketio.on('audience_vote')
+@room_event
+def handle_audience_vote(data):
+    room_id = data.get('room_id'); state = game_states.get(room_id)
+    if not state or request.sid not in state['audience']: return
+    if state['current_mode_key'] == 'estimation':
+        answers = state['estimation_answers']
+        if not answers or answers['revealed'] or request.sid in state['audience_votes']['voters']: return
+        try: answers['values'].append(int(data.get('value')))
+        except (ValueError, TypeError): return
+        state['audience_votes']['voters'].add(request.sid)
+        return
+    votes = state['audience_votes']; answer_index = data.get('answer_index')
+    if not votes or request.sid in votes['voters'] or not isinstance(answer_index, int) or not 0 <= answer_index < len(votes['counts']): return
+    votes['voters'].add(request.sid)
+    votes['counts'][answer_index] += 1
+    queue_audience_histogram(room_id)
 
 # --- GESTIONNAIRES ADMIN ---
+def advance_room(room_id):
+    """Passe à la question suivante du mode en cours (ou conclut la mort subite)."""
+    state = game_states.get(room_id)
+    if not state or not state['game_started']: return
+    # Avancer de force annule l'étape qui était planifiée : la salle ne peut pas avancer deux fois.
+    state['pending_step'] = None
+    mode_key = state['current_mode_key']
+    if mode_key == 'sudden_death': end_game(room_id); return
+    starters = {'simple': start_question_simple, 'buzzer': start_question_buzzer, 'intrus': start_question_intrus, 'estimation': start_question_estimation}
+    if mode_key in starters: starters[mode_key](room_id)
+
+@socketio.on('admin_delete_room')
+@room_event
+def handle_admin_delete_room(data):
+    if request.sid not in admin_sids: return
+    close_game_room(data.get('room_id'), "La salle a été fermée par l'administrateur.")
+
+@socketio.on('admin_drain_server')
+def handle_admin_drain_server():
+    if request.sid not in admin_sids: return
+    # Même sémantique que SIGTERM et le lanceur : un second clic, pendant le drain, le force.
+    request_drain()
+    if drain_forced.is_set(): broadcast_to_admins()
+
+@socketio.on('admin_start_profile')
+def handle_admin_start_profile(data):
+    if request.sid not in admin_sids: return
+    seconds = min(max(1, read_int(data, 'seconds', 10)), CONFIG.get('diagnostics', {}).get('profile_max_seconds', 60))
+    # Un seul profil à la fois : deux échantillonneurs se compteraient l'un l'autre.
+    if PROFILE_STATE['running']: emit('admin_profile_started', {'seconds': seconds, 'busy': True}); return
+    PROFILE_STATE['running'] = True
+    socketio.start_background_task(run_profiler, request.sid, seconds)
+    emit('admin_profile_started', {'seconds': seconds, 'busy': False})
+
+@socketio.on('admin_memory_snapshot')
+def handle_admin_memory_snapshot(data):
+    if request.sid not in admin_sids: return
+    emit('admin_memory_snapshot', take_memory_snapshot(stop=bool(data.get('stop'))))
+
+@socketio.on('admin_room_memory')
+def handle_admin_room_memory():
+    if request.sid not in admin_sids: return
+    socketio.start_background_task(send_room_memory_report, request.sid)
+
+@socketio.on('admin_force_next_round')
+@room_event
+def handle_admin_force_next_round(data):
+    if request.sid not in admin_sids: return
+    advance_room(data.get('room_id'))
+
+@socketio.on('kick_player')
+@room_event
+def handle_kick_player(data):
+    if request.sid not in admin_sids: return
+    room_id = data.get('room_id'); state = game_states.get(room_id)
+    if not state: return
+    index = next((i for i, p in enumerate(state['players']) if p['sid'] == data.get('player_sid')), None)
+    if index is None: return
+    player, was_active = remove_player(room_id, state, index)
+    socketio.emit('you_were_kicked', {'reason': "Vous avez été exclu de la partie."}, room=player['sid'])
+    leave_room(room_id, sid=player['sid'])
+    logger.info("Joueur %s exclu de la salle %s.", player['name'], room_id, extra={'room_id': room_id, 'player': player['name']})
+    if not state['players']: close_game_room(room_id, "La salle a été fermée par l'administrateur."); return
+    socketio.emit('update_state', get_public_state(state), room=room_id)
+    broadcast_to_admins(); broadcast_room_list(room_id)
+    if was_active: advance_room(room_id)
+
 @socketio.on('admin_login')
 def handle_admin_login(data):
     if data.get('password') == CONFIG.get('admin_password', 'admin'):
         admin_sids.add(request.sid)
-        emit('login_success', { 
-            'questions': QUESTION_BANK, 
-            'game_states': game_states, 
-            'game_history': GAME_HISTORY, 
-            'config': CONFIG, 
-            'changelog': CHANGELOG_ENTRIES,
-            'dashboard_stats': get_dashboard_stats()
-        })
+        # Seul le résumé part à la connexion : les onglets se chargent ensuite via admin_fetch_section.
+        emit('login_success', dict(get_admin_summary(), config=CONFIG))
     else: emit('login_fail')
 
+@socketio.on('admin_fetch_section')
+def handle_admin_fetch_section(data):
+    if request.sid not in admin_sids: return
+    section = data.get('section')
+    if section not in ADMIN_SECTIONS: return
+    page, page_size = get_page_params(data, ADMIN_PAGE_SIZE)
+    # « view » est renvoyé tel quel : il indique au panneau quelle liste afficher (une section peut en alimenter plusieurs).
+    response = {'section': section, 'view': str(data.get('view', section)), 'version': get_admin_versions()[section], 'page': page, 'page_size': page_size}
+    # Le client a déjà cette page dans cette version : inutile de la renvoyer.
+    if data.get('known_version') == response['version']:
+        emit('admin_section', dict(response, unchanged=True)); return
+    items, extra = get_admin_section_items(section, data)
+    emit('admin_section', dict(response, **extra, total=len(items), items=items[page * page_size:(page + 1) * page_size]))
+
 @socketio.on('admin_get_player_stats')
 def handle_admin_get_player_stats(data):
     if request.sid not in admin_sids: return
@@ -888,6 +2408,7 @@ def handle_admin_save_player_stats(data):
             PLAYER_STATS[name_key][key] = int(value) if isinstance(value, str) and value.isdigit() else value
         save_stats()
         emit('stats_saved_successfully')
+        notify_admins('stats')
 
 @socketio.on('admin_save_config')
 def handle_admin_save_config(data):
@@ -908,8 +2429,7 @@ def handle_admin_delete_history(data):
     if 0 <= index < len(GAME_HISTORY):
         del GAME_HISTORY[index]
         save_history()
-        for sid in admin_sids:
-            socketio.emit('history_updated', {'history': GAME_HISTORY}, room=sid)
+        notify_admins('history')
 
 @socketio.on('admin_add_changelog')
 def handle_admin_add_changelog(data):
@@ -919,7 +2439,7 @@ def handle_admin_add_changelog(data):
         new_entry = { "id": secrets.token_hex(8), "date": datetime.now().strftime("%d/%m/%Y à %H:%M"), "title": title, "content": content }
         CHANGELOG_ENTRIES.insert(0, new_entry)
         save_changelog()
-        for sid in admin_sids: socketio.emit('update_changelog', {'changelog': CHANGELOG_ENTRIES}, room=sid)
+        notify_admins('changelog')
 
 @socketio.on('admin_delete_changelog')
 def handle_admin_delete_changelog(data):
@@ -928,7 +2448,7 @@ def handle_admin_delete_changelog(data):
     global CHANGELOG_ENTRIES
     CHANGELOG_ENTRIES = [entry for entry in CHANGELOG_ENTRIES if entry.get('id') != entry_id]
     save_changelog()
-    for sid in admin_sids: socketio.emit('update_changelog', {'changelog': CHANGELOG_ENTRIES}, room=sid)
+    notify_admins('changelog')
 
 @socketio.on('admin_update_changelog')
 def handle_admin_update_changelog(data):
@@ -940,7 +2460,7 @@ def handle_admin_update_changelog(data):
             entry['content'] = new_content
             break
     save_changelog()
-    for sid in admin_sids: socketio.emit('update_changelog', {'changelog': CHANGELOG_ENTRIES}, room=sid)
+    notify_admins('changelog')
 
 @socketio.on('admin_move_changelog')
 def handle_admin_move_changelog(data):
@@ -951,7 +2471,7 @@ def handle_admin_move_changelog(data):
     elif direction == 'down' and index < len(CHANGELOG_ENTRIES) - 1:
         CHANGELOG_ENTRIES[index], CHANGELOG_ENTRIES[index + 1] = CHANGELOG_ENTRIES[index + 1], CHANGELOG_ENTRIES[index]
     save_changelog()
-    for sid in admin_sids: socketio.emit('update_changelog', {'changelog': CHANGELOG_ENTRIES}, room=sid)
+    notify_admins('changelog')
 
 @socketio.on('add_question')
 def handle_add_question(data):
@@ -968,15 +2488,15 @@ def handle_add_question(data):
             if theme not in QUESTION_BANK['questions_simples']:
                 QUESTION_BANK['questions_simples'][theme] = []
             QUESTION_BANK['questions_simples'][theme].append(question_data)
+            question_search_index.add('questions_simples', theme, question_data)
             save_questions('questions_simples')
-            emit('update_questions', {'questions': QUESTION_BANK})
-            broadcast_to_admins()
+            notify_admins('questions')
 
     elif q_type == 'questions_intrus':
         QUESTION_BANK['questions_intrus'].append(question_data)
+        question_search_index.add('questions_intrus', None, question_data)
         save_questions('questions_intrus')
-        emit('update_questions', {'questions': QUESTION_BANK})
-        broadcast_to_admins()
+        notify_admins('questions')
 
 @socketio.on('delete_question')
 def handle_delete_question(data):
@@ -984,17 +2504,17 @@ def handle_delete_question(data):
     q_type = data.get('type'); theme = data.get('theme'); index = data.get('index')
     if q_type == 'questions_simples' and theme in QUESTION_BANK['questions_simples']:
         if 0 <= index < len(QUESTION_BANK['questions_simples'][theme]):
+            question_search_index.remove(QUESTION_BANK['questions_simples'][theme][index])
             del QUESTION_BANK['questions_simples'][theme][index]
             if not QUESTION_BANK['questions_simples'][theme]: del QUESTION_BANK['questions_simples'][theme]
             save_questions('questions_simples')
-            emit('update_questions', {'questions': QUESTION_BANK})
-            broadcast_to_admins()
+            notify_admins('questions')
     elif q_type == 'questions_intrus':
         if 0 <= index < len(QUESTION_BANK['questions_intrus']):
+            question_search_index.remove(QUESTION_BANK['questions_intrus'][index])
             del QUESTION_BANK['questions_intrus'][index]
             save_questions('questions_intrus')
-            emit('update_questions', {'questions': QUESTION_BANK})
-            broadcast_to_admins()
+            notify_admins('questions')
 
 @socketio.on('admin_update_question')
 def handle_admin_update_question(data):
@@ -1008,17 +2528,21 @@ def handle_admin_update_question(data):
         index = data.get('index')
         if theme in QUESTION_BANK['questions_simples'] and 0 <= index < len(QUESTION_BANK['questions_simples'][theme]):
             new_data['active'] = QUESTION_BANK['questions_simples'][theme][index].get('active', True)
+            question_search_index.remove(QUESTION_BANK['questions_simples'][theme][index])
             QUESTION_BANK['questions_simples'][theme][index] = new_data
+            question_search_index.add('questions_simples', theme, new_data)
             save_questions('questions_simples')
-            emit('update_questions', {'questions': QUESTION_BANK})
+            notify_admins('questions')
 
     elif q_type == 'questions_intrus':
         index = data.get('index')
         if 0 <= index < len(QUESTION_BANK['questions_intrus']):
             new_data['active'] = QUESTION_BANK['questions_intrus'][index].get('active', True)
+            question_search_index.remove(QUESTION_BANK['questions_intrus'][index])
             QUESTION_BANK['questions_intrus'][index] = new_data
+            question_search_index.add('questions_intrus', None, new_data)
             save_questions('questions_intrus')
-            emit('update_questions', {'questions': QUESTION_BANK})
+            notify_admins('questions')
 
 @socketio.on('admin_toggle_question_status')
 def handle_admin_toggle_question_status(data):
@@ -1032,14 +2556,28 @@ def handle_admin_toggle_question_status(data):
         if theme in QUESTION_BANK['questions_simples'] and 0 <= index < len(QUESTION_BANK['questions_simples'][theme]):
             QUESTION_BANK['questions_simples'][theme][index]['active'] = status
             save_questions('questions_simples')
-            emit('update_questions', {'questions': QUESTION_BANK})
+            notify_admins('questions')
 
     elif q_type == 'questions_intrus':
         index = data.get('index')
         if 0 <= index < len(QUESTION_BANK['questions_intrus']):
             QUESTION_BANK['questions_intrus'][index]['active'] = status
             save_questions('questions_intrus')
-            emit('update_questions', {'questions': QUESTION_BANK})
+            notify_admins('questions')
+
+@socketio.on('admin_search_questions')
+def handle_admin_search_questions(data):
+    if request.sid not in admin_sids: return
+    query = str(data.get('query', ''))[:200]
+    page, page_size = get_page_params(data, 20)
+    q_type = data.get('type') if data.get('type') in QUESTION_BANK else None
+    started = time.perf_counter()
+    hits = question_search_index.search(query, q_type)
+    emit('admin_search_results', {
+        'query': query, 'page': page, 'page_size': page_size, 'total': len(hits),
+        'hits': [question_search_index.describe(doc_id) for doc_id in hits[page * page_size:(page + 1) * page_size]],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
 
 @socketio.on('get_player_stats')
 def handle_get_player_stats(data):
@@ -1068,13 +2606,21 @@ def handle_get_player_stats(data):
 
 # --- DÉMARRAGE DU SERVEUR ---
 if __name__ == '__main__':
-    load_data()
-    cleanup_thread = threading.Thread(target=cleanup_disconnected_players)
-    cleanup_thread.daemon = True
-    cleanup_thread.start()
     try:
-        print("Serveur en cours de démarrage...")
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False)
+        journal.configure()
+        logger.info("Serveur en cours de démarrage (%s)...", SERVER_BACKEND)
+        if SERVER_BACKEND == 'asgi':
+            # serveur_asgi importe ce fichier comme module `server` et charge lui-même les données au démarrage.
+            import serveur_asgi
+            serveur_asgi.run(host='0.0.0.0', port=5000)
+        else:
+            # SIGTERM (arrêt d'un service) déclenche un drain plutôt qu'un arrêt brutal ; un second SIGTERM le force.
+            signal.signal(signal.SIGTERM, lambda signum, frame: request_drain())
+            wait_for_handoff()
+            load_data()
+            start_background_services()
+            socketio.run(app, host='0.0.0.0', port=5000, debug=False)
     except Exception as e:
-        print(f"ERREUR CRITIQUE AU DÉMARRAGE: {e}")
+        logger.critical("ERREUR CRITIQUE AU DÉMARRAGE: %s", e, exc_info=True)
+        journal.stop()
         input("Appuyez sur Entrée pour fermer...")
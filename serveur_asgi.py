@@ -0,0 +1,93 @@
+import asyncio
+import inspect
+import queue
+import signal
+import socket
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+import uvicorn
+from asgiref.wsgi import WsgiToAsgi
+
+# Les gestionnaires et la logique de jeu restent ceux de server.py ; seul le transport change de moteur.
+import server
+
+class AsyncServerBridge:
+    """Présente un socketio.AsyncServer avec l'interface synchrone de socketio.Server qu'utilise Flask-SocketIO.
+    Le code de jeu tourne dans des threads ; chaque appel réseau (emit, join_room...) est confié à la boucle asyncio."""
+    def __init__(self, async_server):
+        self.async_server = async_server
+        self.loop = None
+        # Les acteurs de salle et les tâches de fond sont des threads : files et attentes bloquantes classiques.
+        self.eio = types.SimpleNamespace(async_mode='threading', create_queue=queue.Queue, create_event=threading.Event)
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.async_server, name)
+        if not inspect.iscoroutinefunction(attribute): return attribute
+        return lambda *args, **kwargs: self.call(attribute(*args, **kwargs))
+
+    def emit(self, *args, **kwargs):
+        # Sans attendre la fin de l'envoi : la boucle exécute les envois dans l'ordre où ils ont été confiés.
+        asyncio.run_coroutine_threadsafe(self.async_server.emit(*args, **kwargs), self.loop)
+
+    def sleep(self, seconds=0): time.sleep(seconds)
+
+    def start_background_task(self, target, *args, **kwargs):
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+def run_in_thread(event, handler):
+    """Adapte un gestionnaire Flask-SocketIO (synchrone) : il s'exécute dans le pool de threads, hors de la boucle."""
+    async def run(sid, *args):
+        # Flask-SocketIO retrouve l'application dans l'environnement WSGI de la connexion.
+        if event == 'connect': args[0]['flask.app'] = server.app
+        return await asyncio.to_thread(handler, sid, *args)
+    return run
+
+sio = socketio.AsyncServer(async_mode='asgi', **server.SOCKETIO_OPTIONS)
+for event, handler in server.socketio.server.handlers['/'].items():
+    sio.on(event, run_in_thread(event, handler))
+bridge = AsyncServerBridge(sio)
+server.socketio.server = bridge
+
+def on_startup():
+    bridge.loop = asyncio.get_running_loop()
+    if not server.CONFIG: server.load_data()
+    bridge.loop.set_default_executor(ThreadPoolExecutor(max_workers=server.CONFIG.get('server', {}).get('worker_threads', 8)))
+    server.start_background_services()
+
+# Les pages et fichiers statiques restent servis par Flask, à travers l'adaptateur WSGI -> ASGI.
+application = socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(server.app), on_startup=on_startup)
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        # Comme sous eventlet, SIGTERM déclenche un drain et un second le force ; Ctrl+C (ou un troisième SIGTERM) arrête immédiatement.
+        if sig == signal.SIGTERM and not server.drain_forced.is_set(): server.request_drain()
+        else: super().handle_exit(sig, frame)
+
+# permessage-deflate est négocié par uvicorn, comme par eventlet : la même clé de config.json le désactive.
+uvicorn_server = DrainingServer(uvicorn.Config(application, log_level='warning', ws_per_message_deflate=server.TRANSPORT_PROFILE.get('websocket_compression', True)))
+
+def stop():
+    uvicorn_server.should_exit = True
+
+server.stop_web_server = stop
+
+def run(host='0.0.0.0', port=5000):
+    server.wait_for_handoff()
+    # SO_REUSEPORT, comme eventlet.listen : la relève peut ouvrir le port pendant que l'ancien processus le libère.
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'): listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listener.bind((host, port))
+    uvicorn_server.run(sockets=[listener])
+
+if __name__ == '__main__':
+    run()